@@ -0,0 +1,115 @@
+"""
+Pluggable scene backend used by all ld_tools modules.
+
+Tools call Maya through the ``cmds``, ``mel`` and ``api`` proxies rather than
+importing maya directly, so the same code can run against the real Maya
+session or the pure-Python in-memory scene.
+
+Usage:
+
+    .. code-block:: python
+
+        >>> from ld_tools import backend
+        >>> scene = backend.set_backend(backend.BACKEND_MEMORY)
+        >>> from ld_tools.tools import ld_group_mover
+        >>> ld_group_mover.create_group_mover(['pCube1'])
+        >>> backend.get_backend().calls.most_common(5)
+
+The backend can also be chosen with the LD_TOOLS_BACKEND environment variable.
+"""
+import os
+
+
+BACKEND_ENV = 'LD_TOOLS_BACKEND'
+BACKEND_MAYA = 'maya'
+BACKEND_MEMORY = 'memory'
+
+_BACKEND = None
+_PROFILER = None
+
+
+# ------------------------------------------------------------------------------
+class _BackendProxy(object):
+    """Forward attribute access to a member of the active backend."""
+
+    def __init__(self, member):
+        self._member = member
+
+    def __getattr__(self, name):
+        value = getattr(getattr(get_backend(), self._member), name)
+        if _PROFILER is None or not callable(value):
+            return value
+
+        return _PROFILER.wrap_command('{}.{}'.format(self._member, name), value)
+
+    def __repr__(self):
+        return '<ld_tools.backend.{} proxy>'.format(self._member)
+
+
+cmds = _BackendProxy('cmds')
+mel = _BackendProxy('mel')
+api = _BackendProxy('api')
+
+
+# ------------------------------------------------------------------------------
+def create_backend(name):
+    """
+    Return a new backend instance of the given name.
+
+    :param name: Backend name, BACKEND_MAYA or BACKEND_MEMORY.
+    :type name: str
+    """
+    if name == BACKEND_MAYA:
+        from .maya_backend import MayaBackend
+        return MayaBackend()
+
+    elif name == BACKEND_MEMORY:
+        from .memory import MemoryBackend
+        return MemoryBackend()
+
+    raise ValueError('Unknown backend: {}'.format(name))
+
+
+def set_backend(backend):
+    """
+    Set the active backend.
+
+    :param backend: Backend name or instance.
+    :type backend: str / object
+
+    :return: Active backend.
+    """
+    global _BACKEND
+    if isinstance(backend, str):
+        backend = create_backend(backend)
+
+    _BACKEND = backend
+    return _BACKEND
+
+
+def get_backend():
+    """
+    Return the active backend, creating the default one if none is set.
+
+    :return: Active backend.
+    """
+    if _BACKEND is None:
+        set_backend(os.environ.get(BACKEND_ENV, BACKEND_MAYA))
+
+    return _BACKEND
+
+
+def set_profiler(profiler):
+    """
+    Set the profiler recording every command called through the proxies.
+
+    :param profiler: Object with a wrap_command(name, func) method, or None to
+        stop profiling.
+    """
+    global _PROFILER
+    _PROFILER = profiler
+
+
+def get_profiler():
+    """Return the active profiler, None if not profiling."""
+    return _PROFILER
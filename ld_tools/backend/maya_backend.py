@@ -0,0 +1,151 @@
+"""
+Backend running against the current Maya session.
+"""
+import maya.api.OpenMaya as om2
+import maya.cmds
+import maya.mel
+
+
+# ------------------------------------------------------------------------------
+def get_dag_path(node):
+    selection = om2.MSelectionList()
+    selection.add(node)
+    return selection.getDagPath(0)
+
+
+class MayaApi(object):
+    """Bulk geometry access through OpenMaya 2.0."""
+
+    def get_points(self, shape, world=False):
+        dag_path = get_dag_path(shape)
+        space = om2.MSpace.kWorld if world else om2.MSpace.kObject
+        if dag_path.hasFn(om2.MFn.kMesh):
+            points = om2.MFnMesh(dag_path).getPoints(space)
+        elif dag_path.hasFn(om2.MFn.kNurbsCurve):
+            points = om2.MFnNurbsCurve(dag_path).cvPositions(space)
+        else:
+            raise TypeError('Unsupported shape type: {}'.format(shape))
+
+        return [[point.x, point.y, point.z] for point in points]
+
+    def set_points(self, shape, points, world=False):
+        dag_path = get_dag_path(shape)
+        space = om2.MSpace.kWorld if world else om2.MSpace.kObject
+        point_array = om2.MPointArray([om2.MPoint(*point) for point in points])
+        if dag_path.hasFn(om2.MFn.kMesh):
+            om2.MFnMesh(dag_path).setPoints(point_array, space)
+        elif dag_path.hasFn(om2.MFn.kNurbsCurve):
+            fn_curve = om2.MFnNurbsCurve(dag_path)
+            fn_curve.setCVPositions(point_array, space)
+            fn_curve.updateCurve()
+        else:
+            raise TypeError('Unsupported shape type: {}'.format(shape))
+
+    def get_mesh_topology(self, mesh):
+        counts, connects = om2.MFnMesh(get_dag_path(mesh)).getVertices()
+        return list(counts), list(connects)
+
+    def snap_transforms(self, pairs, scale=False):
+        # Resolve every node once, MSelectionList merges duplicates.
+        nodes = set(node for pair in pairs for node in pair)
+        dag_paths = dict((node, get_dag_path(node)) for node in nodes)
+
+        # Read pass.
+        world_matrices = dict(
+            (source, dag_paths[source].inclusiveMatrix())
+            for source, _ in pairs
+        )
+
+        # Write pass.
+        modifier = om2.MDGModifier()
+        for source, target in pairs:
+            target_path = dag_paths[target]
+            fn_transform = om2.MFnTransform(target_path)
+
+            # world = local * offsetParentMatrix * parent
+            matrix = world_matrices[source] * target_path.exclusiveMatrixInverse()
+            if fn_transform.hasAttribute('offsetParentMatrix'):
+                offset_plug = fn_transform.findPlug('offsetParentMatrix', False)
+                matrix *= om2.MFnMatrixData(offset_plug.asMObject()).matrix().inverse()
+            local = om2.MTransformationMatrix(matrix)
+
+            # rotate = inverse(rotateAxis) * rotation * inverse(jointOrient)
+            rotation = fn_transform.rotateOrientation(om2.MSpace.kTransform).inverse()
+            rotation *= local.rotation(asQuaternion=True)
+            if target_path.hasFn(om2.MFn.kJoint):
+                orient_plug = fn_transform.findPlug('jointOrient', False)
+                orient = om2.MEulerRotation(
+                    [orient_plug.child(i).asMAngle().asRadians() for i in range(3)],
+                )
+                rotation *= orient.asQuaternion().inverse()
+
+            rotate_order = fn_transform.findPlug('rotateOrder', False).asInt()
+            euler = rotation.asEulerRotation().reorder(rotate_order)
+
+            translation = local.translation(om2.MSpace.kTransform)
+            if not target_path.hasFn(om2.MFn.kJoint):
+                # Remove what the pivots and pivot translations add to the
+                # translation, given the new rotation and scale.
+                pivots = fn_transform.transformation()
+                pivots.setRotation(euler)
+                if scale:
+                    pivots.setScale(local.scale(om2.MSpace.kTransform), om2.MSpace.kTransform)
+                pivots.setTranslation(om2.MVector(), om2.MSpace.kTransform)
+                offset = pivots.asMatrix()
+                translation -= om2.MVector(offset[12], offset[13], offset[14])
+
+            translate_plug = fn_transform.findPlug('translate', False)
+            rotate_plug = fn_transform.findPlug('rotate', False)
+            for i in range(3):
+                modifier.newPlugValueDouble(translate_plug.child(i), translation[i])
+                modifier.newPlugValueMAngle(rotate_plug.child(i), om2.MAngle(euler[i]))
+
+            if scale:
+                scale_plug = fn_transform.findPlug('scale', False)
+                for i, value in enumerate(local.scale(om2.MSpace.kTransform)):
+                    modifier.newPlugValueDouble(scale_plug.child(i), value)
+
+        modifier.doIt()
+        return modifier
+
+    def get_soft_selection(self):
+        selection = om2.MGlobal.getRichSelection().getSelection()
+
+        results = {}
+        for i in range(selection.length()):
+            dag_path, component = selection.getComponent(i)
+            if component.isNull() or not component.hasFn(om2.MFn.kMeshVertComponent):
+                continue
+
+            # Grab the parent of the shape node
+            dag_path.pop()
+            fn_comp = om2.MFnSingleIndexedComponent(component)
+            elements = fn_comp.getElements()
+            if fn_comp.hasWeights:
+                weights = [fn_comp.weight(j).influence for j in range(len(elements))]
+            else:
+                weights = [1.0] * len(elements)
+
+            indices, values = results.setdefault(dag_path.fullPathName(), ([], []))
+            indices.extend(elements)
+            values.extend(weights)
+
+        return results
+
+
+# ------------------------------------------------------------------------------
+class MayaBackend(object):
+    name = 'maya'
+
+    def __init__(self):
+        self.cmds = maya.cmds
+        self.mel = maya.mel
+        self.api = MayaApi()
+
+    def open_scene(self, path):
+        self.cmds.file(path, open=True, force=True)
+
+    def save_scene(self, path=None):
+        if path:
+            self.cmds.file(rename=path)
+        self.cmds.file(save=True, force=True)
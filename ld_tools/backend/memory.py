@@ -0,0 +1,1450 @@
+"""
+Pure-Python in-memory scene standing in for maya.cmds.
+
+Covers the subset of commands used by ld_tools: transforms, meshes, curves,
+clusters, sets, attributes and connections. Every command call is counted, so
+hot paths can be measured without Maya.
+
+Usage:
+
+    .. code-block:: python
+
+        >>> from ld_tools import backend
+        >>> memory = backend.set_backend(backend.BACKEND_MEMORY)
+        >>> memory.scene.create_mesh('pPlane1', points, counts, connects)
+        >>> memory.cmds.listRelatives('pPlane1', shapes=True)
+        ['pPlane1Shape']
+        >>> memory.calls['listRelatives']
+        1
+
+Only the xyz rotate order is evaluated and pivots are not part of the matrix.
+"""
+from collections import Counter
+import copy
+import fnmatch
+from functools import wraps
+import json
+import math
+import re
+import uuid
+
+
+SHAPE_TYPES = ('mesh', 'nurbsCurve', 'nurbsSurface', 'clusterHandle', 'locator', 'camera')
+TRANSFORM_TYPES = ('transform', 'joint')
+DAG_TYPES = TRANSFORM_TYPES + SHAPE_TYPES
+
+TYPE_INHERITANCE = {
+    'transform': TRANSFORM_TYPES,
+    'dagNode': DAG_TYPES,
+    'shape': SHAPE_TYPES,
+    'geometryShape': ('mesh', 'nurbsCurve', 'nurbsSurface'),
+    'controlPoint': ('mesh', 'nurbsCurve', 'nurbsSurface'),
+    'geometryFilter': ('cluster',),
+    'weightGeometryFilter': ('cluster',),
+    'objectSet': ('objectSet', 'shadingEngine'),
+}
+
+IDENTITY = [
+    1.0, 0.0, 0.0, 0.0,
+    0.0, 1.0, 0.0, 0.0,
+    0.0, 0.0, 1.0, 0.0,
+    0.0, 0.0, 0.0, 1.0,
+]
+
+_DISPLAY_DEFAULTS = {
+    'overrideEnabled': False,
+    'overrideColor': 0,
+}
+
+DEFAULT_ATTRS = {
+    'transform': dict(_DISPLAY_DEFAULTS, **{
+        'translate': [0.0, 0.0, 0.0],
+        'rotate': [0.0, 0.0, 0.0],
+        'scale': [1.0, 1.0, 1.0],
+        'rotatePivot': [0.0, 0.0, 0.0],
+        'scalePivot': [0.0, 0.0, 0.0],
+        'rotateOrder': 0,
+        'visibility': True,
+        'inheritsTransform': True,
+        'offsetParentMatrix': list(IDENTITY),
+    }),
+    'mesh': dict(_DISPLAY_DEFAULTS, intermediateObject=False, visibility=True),
+    'nurbsCurve': dict(_DISPLAY_DEFAULTS, intermediateObject=False, visibility=True, degree=3),
+    'clusterHandle': dict(_DISPLAY_DEFAULTS, intermediateObject=False, visibility=True),
+    'cluster': {'relative': False, 'origin': [0.0, 0.0, 0.0], 'envelope': 1.0},
+    'polyCube': {'width': 1.0, 'height': 1.0, 'depth': 1.0},
+    'displayLayer': {'displayType': 0, 'visibility': True},
+    'lambert': {'color': [0.5, 0.5, 0.5], 'transparency': [0.0, 0.0, 0.0]},
+}
+DEFAULT_ATTRS['joint'] = dict(DEFAULT_ATTRS['transform'], jointOrient=[0.0, 0.0, 0.0])
+
+ATTR_ALIASES = {
+    't': 'translate', 'r': 'rotate', 's': 'scale', 'v': 'visibility',
+    'ro': 'rotateOrder', 'rp': 'rotatePivot', 'sp': 'scalePivot', 'jo': 'jointOrient',
+    'opm': 'offsetParentMatrix', 'io': 'intermediateObject', 'w': 'weight',
+}
+for _short, _long in (('t', 'translate'), ('r', 'rotate'), ('s', 'scale'), ('jo', 'jointOrient')):
+    for _index, _axis in enumerate('xyz'):
+        ATTR_ALIASES[_short + _axis] = (_long, _index)
+        ATTR_ALIASES[_long + _axis.upper()] = (_long, _index)
+
+COMPONENT_REGEX = re.compile(r'^(?P<node>[^.]+)\.(?P<type>vtx|cv|f|e|pt|pnts)\[(?P<indices>[^\]]+)\]$')
+INDEX_REGEX = re.compile(r'^(?P<attr>.+)\[(?P<start>\d+)(?::(?P<end>\d+))?\]$')
+
+
+# ------------------------------------------------------------------------------
+def _flag(kwargs, *names, **options):
+    """Return the value of the first given flag name found in kwargs."""
+    for name in names:
+        if name in kwargs:
+            return kwargs[name]
+    return options.get('default')
+
+
+def _flatten(args):
+    results = []
+    for arg in args:
+        if isinstance(arg, (list, tuple, set)):
+            results.extend(_flatten(arg))
+        elif arg is not None:
+            results.append(arg)
+    return results
+
+
+def _compact_ranges(indices):
+    ranges = []
+    for index in sorted(indices):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ranges
+
+
+def _format_range(start, end):
+    return str(start) if start == end else '{}:{}'.format(start, end)
+
+
+def _parse_indices(text, count):
+    if text == '*':
+        return list(range(count))
+
+    results = []
+    for part in text.split(','):
+        if ':' in part:
+            start, end = part.split(':')
+            results.extend(range(int(start), int(end) + 1))
+        else:
+            results.append(int(part))
+    return results
+
+
+# ------------------------------------------------------------------------------
+def matrix_multiply(a, b):
+    return [
+        sum(a[row * 4 + k] * b[k * 4 + column] for k in range(4))
+        for row in range(4)
+        for column in range(4)
+    ]
+
+
+def matrix_inverse(m):
+    """Return the inverse of an affine matrix."""
+    a, b, c = m[0], m[1], m[2]
+    d, e, f = m[4], m[5], m[6]
+    g, h, i = m[8], m[9], m[10]
+    det = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+    if not det:
+        raise ValueError('Matrix is not invertible.')
+
+    inv = [
+        (e * i - f * h) / det, (c * h - b * i) / det, (b * f - c * e) / det,
+        (f * g - d * i) / det, (a * i - c * g) / det, (c * d - a * f) / det,
+        (d * h - e * g) / det, (b * g - a * h) / det, (a * e - b * d) / det,
+    ]
+    tx, ty, tz = m[12], m[13], m[14]
+    return [
+        inv[0], inv[1], inv[2], 0.0,
+        inv[3], inv[4], inv[5], 0.0,
+        inv[6], inv[7], inv[8], 0.0,
+        -(tx * inv[0] + ty * inv[3] + tz * inv[6]),
+        -(tx * inv[1] + ty * inv[4] + tz * inv[7]),
+        -(tx * inv[2] + ty * inv[5] + tz * inv[8]),
+        1.0,
+    ]
+
+
+def compose_matrix(translate, rotate, scale):
+    """Return the xyz rotate order matrix of the given components in degrees."""
+    cx, cy, cz = [math.cos(math.radians(value)) for value in rotate]
+    sx, sy, sz = [math.sin(math.radians(value)) for value in rotate]
+    rotation = [
+        cy * cz, cy * sz, -sy,
+        sx * sy * cz - cx * sz, sx * sy * sz + cx * cz, sx * cy,
+        cx * sy * cz + sx * sz, cx * sy * sz - sx * cz, cx * cy,
+    ]
+    result = []
+    for row in range(3):
+        result.extend([value * scale[row] for value in rotation[row * 3:row * 3 + 3]])
+        result.append(0.0)
+    result.extend([translate[0], translate[1], translate[2], 1.0])
+    return result
+
+
+def decompose_matrix(m):
+    """Return the translate, xyz rotate (degrees) and scale of the matrix."""
+    rows = [m[0:3], m[4:7], m[8:11]]
+    scale = [math.sqrt(sum(value * value for value in row)) for row in rows]
+    r = [[value / (scale[i] or 1.0) for value in row] for i, row in enumerate(rows)]
+
+    sy = max(-1.0, min(1.0, -r[0][2]))
+    y = math.asin(sy)
+    if abs(math.cos(y)) > 1e-6:
+        x = math.atan2(r[1][2], r[2][2])
+        z = math.atan2(r[0][1], r[0][0])
+    else:
+        x = math.atan2(-r[2][1], r[1][1])
+        z = 0.0
+
+    rotate = [math.degrees(x), math.degrees(y), math.degrees(z)]
+    return list(m[12:15]), rotate, scale
+
+
+def transform_point(point, m):
+    x, y, z = point
+    return [
+        x * m[0] + y * m[4] + z * m[8] + m[12],
+        x * m[1] + y * m[5] + z * m[9] + m[13],
+        x * m[2] + y * m[6] + z * m[10] + m[14],
+    ]
+
+
+# ------------------------------------------------------------------------------
+class Node(object):
+    """Single node of the in-memory scene."""
+
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.children = []
+        self.attrs = copy.deepcopy(DEFAULT_ATTRS.get(node_type, {}))
+        self.attr_types = {}
+        self.locked = set()
+        self.uuid = str(uuid.uuid4()).upper()
+        self.data = {}
+
+    def __repr__(self):
+        return '<Node {} ({})>'.format(self.name, self.type)
+
+    @property
+    def is_dag(self):
+        return self.type in DAG_TYPES
+
+    @property
+    def path(self):
+        if not self.is_dag:
+            return self.name
+
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return '|' + '|'.join(reversed(names))
+
+    def is_type(self, node_type):
+        return self.type == node_type or self.type in TYPE_INHERITANCE.get(node_type, ())
+
+    def iter_descendants(self):
+        for child in self.children:
+            yield child
+            for descendant in child.iter_descendants():
+                yield descendant
+
+    def has_attr(self, attr):
+        attr = attr.split('[', 1)[0].split('.', 1)[0]
+        attr = ATTR_ALIASES.get(attr, attr)
+        if isinstance(attr, tuple):
+            attr = attr[0]
+        if any(key.startswith(attr + '[') for key in self.attrs):
+            return True
+        return attr in self.attrs or attr in self.attr_types or attr in (
+            'message', 'matrix', 'inverseMatrix', 'worldMatrix', 'worldInverseMatrix', 'parentMatrix',
+            'parentInverseMatrix', 'instObjGroups', 'controlPoints', 'boundingBoxMin', 'boundingBoxMax',
+        )
+
+
+class MemoryScene(object):
+    """In-memory scene graph."""
+
+    def __init__(self):
+        self.path = None
+        self.nodes = {}
+        self.connections = []
+        self.selection = []
+        self.soft_selection = {}
+        self.deferred = []
+        self.script_jobs = {}
+
+    # --------------------------------------------------------------------------
+    def unique_name(self, name):
+        if '#' in name:
+            name = name.replace('#', '1')
+        if name not in self.nodes:
+            return name
+
+        base = name.rstrip('0123456789')
+        index = 1
+        while '{}{}'.format(base, index) in self.nodes:
+            index += 1
+        return '{}{}'.format(base, index)
+
+    def add_node(self, name, node_type, parent=None):
+        node = Node(self.unique_name(name), node_type, parent=parent)
+        self.nodes[node.name] = node
+        if parent is not None:
+            parent.children.append(node)
+        return node
+
+    def find(self, name):
+        """Return the node matching the name or path, None if not found."""
+        if isinstance(name, Node):
+            return name
+        name = name.split('.', 1)[0]
+        node = self.nodes.get(name.rsplit('|', 1)[-1])
+        if node is None:
+            for other in self.nodes.values():
+                if other.uuid == name:
+                    return other
+        return node
+
+    def get(self, name):
+        node = self.find(name)
+        if node is None:
+            raise ValueError('No object matches name: {}'.format(name))
+        return node
+
+    def remove_node(self, node):
+        for descendant in list(node.iter_descendants()):
+            self._remove_single(descendant)
+        self._remove_single(node)
+
+    def _remove_single(self, node):
+        if self.nodes.get(node.name) is not node:
+            return
+        del self.nodes[node.name]
+        if node.parent is not None and node in node.parent.children:
+            node.parent.children.remove(node)
+        self.connections = [
+            connection
+            for connection in self.connections
+            if connection[0] is not node and connection[2] is not node
+        ]
+        self.selection = [item for item in self.selection if self.find(item) is not None]
+        for other in self.nodes.values():
+            if 'members' in other.data:
+                other.data['members'] = [member for member in other.data['members'] if member[0] is not node]
+
+    def rename_node(self, node, name):
+        name = self.unique_name(name) if name != node.name else name
+        del self.nodes[node.name]
+        node.name = name
+        self.nodes[name] = node
+        return name
+
+    # --------------------------------------------------------------------------
+    def create_transform(self, name, parent=None):
+        return self.add_node(name, 'transform', parent=parent)
+
+    def _create_shape(self, name, node_type, parent=None):
+        transform = self.create_transform(name, parent=self.find(parent) if parent else None)
+        shape = self.add_node(transform.name + 'Shape', node_type, parent=transform)
+        return transform, shape
+
+    def create_mesh(self, name, points, counts, connects, parent=None):
+        """
+        Create a mesh from its points and polygon vertex counts and indices.
+
+        :return: Transform and shape nodes.
+        :rtype: Node, Node
+        """
+        transform, shape = self._create_shape(name, 'mesh', parent=parent)
+        shape.data['points'] = [list(point) for point in points]
+        shape.data['counts'] = list(counts)
+        shape.data['connects'] = list(connects)
+        return transform, shape
+
+    def create_cube(self, name, width=1.0, height=1.0, depth=1.0, parent=None):
+        x, y, z = width * 0.5, height * 0.5, depth * 0.5
+        points = [
+            [-x, -y, z], [x, -y, z], [-x, y, z], [x, y, z],
+            [-x, y, -z], [x, y, -z], [-x, -y, -z], [x, -y, -z],
+        ]
+        counts = [4] * 6
+        connects = [0, 1, 3, 2, 2, 3, 5, 4, 4, 5, 7, 6, 6, 7, 1, 0, 1, 7, 5, 3, 6, 0, 2, 4]
+        return self.create_mesh(name, points, counts, connects, parent=parent)
+
+    def create_curve(self, name, points, degree=3, parent=None):
+        """
+        Create a nurbsCurve from its CV positions.
+
+        :return: Transform and shape nodes.
+        :rtype: Node, Node
+        """
+        transform, shape = self._create_shape(name, 'nurbsCurve', parent=parent)
+        shape.data['points'] = [list(point) for point in points]
+        shape.attrs['degree'] = degree
+        return transform, shape
+
+    # --------------------------------------------------------------------------
+    def transform_matrix(self, node):
+        """Return the translate, rotate and scale matrix, excluding offsetParentMatrix."""
+        if not node.is_type('transform'):
+            return list(IDENTITY)
+        return compose_matrix(node.attrs['translate'], node.attrs['rotate'], node.attrs['scale'])
+
+    def local_matrix(self, node):
+        if not node.is_type('transform'):
+            return list(IDENTITY)
+        return matrix_multiply(self.transform_matrix(node), node.attrs['offsetParentMatrix'])
+
+    def world_matrix(self, node):
+        matrix = self.local_matrix(node)
+        parent = node.parent
+        while parent is not None:
+            matrix = matrix_multiply(matrix, self.local_matrix(parent))
+            parent = parent.parent
+        return matrix
+
+    def parent_matrix(self, node):
+        if node.parent is None:
+            return list(IDENTITY)
+        return self.world_matrix(node.parent)
+
+    def set_world_matrix(self, node, matrix):
+        local = matrix_multiply(matrix, matrix_inverse(self.parent_matrix(node)))
+        local = matrix_multiply(local, matrix_inverse(node.attrs['offsetParentMatrix']))
+        translate, rotate, scale = decompose_matrix(local)
+        node.attrs['translate'] = translate
+        node.attrs['rotate'] = rotate
+        node.attrs['scale'] = scale
+
+    def get_shape(self, node):
+        node = self.get(node)
+        if node.type in SHAPE_TYPES:
+            return node
+        for child in node.children:
+            if child.type in SHAPE_TYPES and not child.attrs.get('intermediateObject'):
+                return child
+        raise ValueError('No shape found under: {}'.format(node.name))
+
+    # --------------------------------------------------------------------------
+    def to_dict(self):
+        nodes = []
+        ordered = sorted(self.nodes.values(), key=lambda node: node.path.count('|'))
+        for node in ordered:
+            nodes.append({
+                'name': node.name,
+                'type': node.type,
+                'parent': node.parent.name if node.parent else None,
+                'uuid': node.uuid,
+                'attrs': node.attrs,
+                'attr_types': node.attr_types,
+                'locked': sorted(node.locked),
+                'data': {
+                    key: value
+                    for key, value in node.data.items()
+                    if key not in ('members', 'geometry')
+                },
+                'members': [
+                    [member[0].name, member[1], sorted(member[2]) if member[2] is not None else None]
+                    for member in node.data.get('members', [])
+                ],
+                'geometry': [shape.name for shape in node.data.get('geometry', [])],
+            })
+        return {
+            'nodes': nodes,
+            'connections': [
+                [src.name, src_attr, dst.name, dst_attr]
+                for src, src_attr, dst, dst_attr in self.connections
+            ],
+            'selection': list(self.selection),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        scene = cls()
+        for item in data.get('nodes', []):
+            parent = scene.nodes[item['parent']] if item.get('parent') else None
+            node = Node(item['name'], item['type'], parent=parent)
+            node.uuid = item.get('uuid', node.uuid)
+            node.attrs.update(item.get('attrs', {}))
+            node.attr_types.update(item.get('attr_types', {}))
+            node.locked = set(item.get('locked', []))
+            node.data.update(item.get('data', {}))
+            scene.nodes[node.name] = node
+            if parent is not None:
+                parent.children.append(node)
+
+        for item in data.get('nodes', []):
+            node = scene.nodes[item['name']]
+            if item.get('members') or node.type in ('objectSet', 'shadingEngine'):
+                node.data['members'] = [
+                    (scene.nodes[name], comp_type, set(indices) if indices is not None else None)
+                    for name, comp_type, indices in item.get('members', [])
+                ]
+            if item.get('geometry') or node.type == 'cluster':
+                node.data['geometry'] = [scene.nodes[name] for name in item.get('geometry', [])]
+
+        scene.connections = [
+            (scene.nodes[src], src_attr, scene.nodes[dst], dst_attr)
+            for src, src_attr, dst, dst_attr in data.get('connections', [])
+        ]
+        scene.selection = list(data.get('selection', []))
+        return scene
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+# ------------------------------------------------------------------------------
+def _counted(name, func):
+    @wraps(func)
+    def decorated(self, *args, **kwargs):
+        self.calls[name] += 1
+        return func(self, *args, **kwargs)
+    return decorated
+
+
+def count_calls(cls):
+    """Count every call made to the public methods of the class."""
+    for name, value in list(vars(cls).items()):
+        if not name.startswith('_') and callable(value):
+            setattr(cls, name, _counted(name, value))
+    return cls
+
+
+@count_calls
+class MemoryCmds(object):
+    """maya.cmds compatible command set over a MemoryScene."""
+
+    def __init__(self, scene, calls):
+        self._scene = scene
+        self.calls = calls
+
+    # --------------------------------------------------------------------------
+    def _name(self, node, long=False):
+        return node.path if long else node.name
+
+    def _split_plug(self, plug):
+        node_name, attr = plug.split('.', 1)
+        return self._scene.get(node_name), attr
+
+    def _resolve_attr(self, attr):
+        alias = ATTR_ALIASES.get(attr, attr)
+        if isinstance(alias, tuple):
+            return alias
+        return alias, None
+
+    def _components(self, items):
+        """Return (node, component type, indices) for each component string."""
+        results = []
+        for item in _flatten(items):
+            match = COMPONENT_REGEX.match(item)
+            if not match:
+                node = self._scene.get(item)
+                shape = self._scene.get_shape(node)
+                results.append((shape, 'vtx', list(range(len(shape.data.get('points', []))))))
+                continue
+
+            shape = self._scene.get_shape(match.group('node'))
+            count = len(shape.data.get('points', []))
+            results.append((shape, match.group('type'), _parse_indices(match.group('indices'), count)))
+        return results
+
+    def _transform_of(self, node):
+        return node.parent if node.type in SHAPE_TYPES else node
+
+    def _component_strings(self, node, comp_type, indices):
+        owner = self._transform_of(node).name
+        return [
+            '{}.{}[{}]'.format(owner, comp_type, _format_range(start, end))
+            for start, end in _compact_ranges(indices)
+        ]
+
+    # --------------------------------------------------------------------------
+    def objExists(self, name):
+        if '.' in name:
+            node = self._scene.find(name)
+            return node is not None and node.has_attr(name.split('.', 1)[1])
+        return self._scene.find(name) is not None
+
+    def nodeType(self, name):
+        return self._scene.get(name).type
+
+    def createNode(self, node_type, **kwargs):
+        name = _flag(kwargs, 'n', 'name') or node_type + '#'
+        parent = _flag(kwargs, 'p', 'parent')
+        parent = self._scene.get(parent) if parent else None
+        if node_type in SHAPE_TYPES and parent is None:
+            parent = self._scene.create_transform(node_type + '#')
+        node = self._scene.add_node(name, node_type, parent=parent)
+        if node_type in ('objectSet', 'shadingEngine'):
+            node.data['members'] = []
+        return node.name
+
+    def shadingNode(self, node_type, **kwargs):
+        return self._scene.add_node(_flag(kwargs, 'n', 'name') or node_type + '#', node_type).name
+
+    def delete(self, *nodes, **kwargs):
+        if _flag(kwargs, 'ch', 'constructionHistory'):
+            return
+        for name in _flatten(nodes):
+            node = self._scene.find(name)
+            if node is not None:
+                self._scene.remove_node(node)
+
+    def rename(self, old, new):
+        return self._scene.rename_node(self._scene.get(old), new)
+
+    def ls(self, *args, **kwargs):
+        long = _flag(kwargs, 'l', 'long')
+        node_type = _flag(kwargs, 'type', 'typ')
+        node_types = _flatten([node_type]) if node_type else None
+        objects_only = _flag(kwargs, 'o', 'objectsOnly')
+        as_uuid = _flag(kwargs, 'uid', 'uuid')
+        items = _flatten(args)
+
+        if _flag(kwargs, 'sl', 'selection'):
+            items = list(self._scene.selection)
+        elif not items:
+            items = [node.name for node in self._scene.nodes.values()]
+
+        results = []
+        for item in items:
+            if COMPONENT_REGEX.match(item):
+                node = self._scene.find(item)
+                if node is None:
+                    continue
+                if objects_only:
+                    candidates = [node]
+                else:
+                    results.append(item)
+                    continue
+            elif '.' in item:
+                pattern, attr = item.split('.', 1)
+                candidates = [
+                    node
+                    for node in self._scene.nodes.values()
+                    if fnmatch.fnmatchcase(node.name, pattern or '*') and node.has_attr(attr)
+                ]
+            elif any(char in item for char in '*?['):
+                candidates = [
+                    node
+                    for node in self._scene.nodes.values()
+                    if fnmatch.fnmatchcase(node.name, item.rsplit('|', 1)[-1])
+                ]
+            else:
+                candidates = [self._scene.find(item)]
+
+            for node in candidates:
+                if node is None:
+                    continue
+                if node_types and not any(node.is_type(each) for each in node_types):
+                    continue
+                value = node.uuid if as_uuid else self._name(node, long)
+                if value not in results:
+                    results.append(value)
+
+        return results
+
+    def listRelatives(self, *nodes, **kwargs):
+        full_path = _flag(kwargs, 'f', 'fullPath')
+        node_type = _flag(kwargs, 'type', 'typ')
+        node_types = _flatten([node_type]) if node_type else None
+        no_intermediate = _flag(kwargs, 'ni', 'noIntermediate')
+
+        items = _flatten(nodes) or list(self._scene.selection)
+        results = []
+        for item in items:
+            node = self._scene.get(item)
+            if _flag(kwargs, 'p', 'parent', 'ap', 'allParents'):
+                relatives = [node.parent] if node.parent is not None else []
+            elif _flag(kwargs, 'ad', 'allDescendents'):
+                relatives = list(node.iter_descendants())
+            elif _flag(kwargs, 's', 'shapes'):
+                relatives = [child for child in node.children if child.type in SHAPE_TYPES]
+            else:
+                relatives = list(node.children)
+
+            for relative in relatives:
+                if node_types and not any(relative.is_type(each) for each in node_types):
+                    continue
+                if no_intermediate and relative.attrs.get('intermediateObject'):
+                    continue
+                name = self._name(relative, full_path)
+                if name not in results:
+                    results.append(name)
+
+        return results or None
+
+    def parent(self, *nodes, **kwargs):
+        items = _flatten(nodes)
+        if _flag(kwargs, 'w', 'world'):
+            new_parent = None
+        else:
+            new_parent = self._scene.get(items.pop())
+
+        results = []
+        for item in items:
+            node = self._scene.get(item)
+            world = self._scene.world_matrix(node)
+            if node.parent is not None:
+                node.parent.children.remove(node)
+            node.parent = new_parent
+            if new_parent is not None:
+                new_parent.children.append(node)
+            if not _flag(kwargs, 'r', 'relative'):
+                self._scene.set_world_matrix(node, world)
+            results.append(node.name)
+        return results
+
+    def group(self, *nodes, **kwargs):
+        parent = _flag(kwargs, 'p', 'parent')
+        group = self._scene.create_transform(
+            _flag(kwargs, 'n', 'name') or 'group#',
+            parent=self._scene.get(parent) if parent else None,
+        )
+        items = _flatten(nodes)
+        if items and not _flag(kwargs, 'em', 'empty'):
+            self.parent(items, group.name)
+        return group.name
+
+    def duplicate(self, *nodes, **kwargs):
+        name = _flag(kwargs, 'n', 'name')
+        instance_leaf = _flag(kwargs, 'ilf', 'instanceLeaf')
+        results = []
+        for item in _flatten(nodes) or list(self._scene.selection):
+            source = self._scene.get(item)
+            results.append(self._duplicate(source, source.parent, name, instance_leaf).name)
+            name = None
+        return results
+
+    def _duplicate(self, source, parent, name, instance_leaf):
+        node = self._scene.add_node(name or source.name, source.type, parent=parent)
+        node.attrs = copy.deepcopy(source.attrs)
+        node.attr_types = dict(source.attr_types)
+        node.locked = set(source.locked)
+        node.data = source.data if (instance_leaf and source.type in SHAPE_TYPES) else copy.deepcopy(source.data)
+        for child in source.children:
+            child_name = node.name + 'Shape' if child.type in SHAPE_TYPES else None
+            self._duplicate(child, node, child_name, instance_leaf)
+        return node
+
+    def select(self, *items, **kwargs):
+        items = _flatten(items)
+        selection = self._scene.selection
+        if _flag(kwargs, 'cl', 'clear'):
+            del selection[:]
+            return
+        for item in items:
+            if self._scene.find(item) is None:
+                raise ValueError('No object matches name: {}'.format(item))
+
+        if _flag(kwargs, 'add', 'af', 'addFirst'):
+            selection.extend(item for item in items if item not in selection)
+        elif _flag(kwargs, 'd', 'deselect'):
+            selection[:] = [item for item in selection if item not in items]
+        elif _flag(kwargs, 'tgl', 'toggle'):
+            for item in items:
+                if item in selection:
+                    selection.remove(item)
+                else:
+                    selection.append(item)
+        else:
+            selection[:] = list(items)
+
+    def hide(self, *items, **kwargs):
+        for item in _flatten(items) or list(self._scene.selection):
+            self._scene.get(item).attrs['visibility'] = False
+
+    def showHidden(self, *items, **kwargs):
+        for item in _flatten(items) or list(self._scene.selection):
+            self._scene.get(item).attrs['visibility'] = True
+
+    # --------------------------------------------------------------------------
+    def addAttr(self, *nodes, **kwargs):
+        attr = _flag(kwargs, 'ln', 'longName')
+        attr_type = _flag(kwargs, 'at', 'attributeType', 'dt', 'dataType') or 'double'
+        multi = _flag(kwargs, 'm', 'multi')
+        default = _flag(kwargs, 'dv', 'defaultValue')
+        for item in _flatten(nodes) or list(self._scene.selection):
+            node = self._scene.get(item)
+            if node.has_attr(attr):
+                raise RuntimeError('Attribute already exists: {}.{}'.format(node.name, attr))
+            node.attr_types[attr] = attr_type
+            if multi or attr_type in ('message', 'compound'):
+                continue
+            if attr_type in ('string', 'stringArray', 'matrix'):
+                node.attrs[attr] = default
+            else:
+                node.attrs[attr] = default if default is not None else 0
+
+    def deleteAttr(self, plug, **kwargs):
+        node, attr = self._split_plug(plug)
+        node.attr_types.pop(attr, None)
+        for key in list(node.attrs):
+            if key == attr or key.startswith(attr + '['):
+                del node.attrs[key]
+
+    def removeMultiInstance(self, plug, **kwargs):
+        node, attr = self._split_plug(plug)
+        for key in list(node.attrs):
+            if key == attr or key.startswith(attr + '.'):
+                del node.attrs[key]
+        self._scene.connections = [
+            (src, src_attr, dst, dst_attr)
+            for src, src_attr, dst, dst_attr in self._scene.connections
+            if not any(
+                other is node and (other_attr == attr or other_attr.startswith(attr + '.'))
+                for other, other_attr in ((src, src_attr), (dst, dst_attr))
+            )
+        ]
+
+    def attributeQuery(self, attr, **kwargs):
+        node = self._scene.get(_flag(kwargs, 'n', 'node'))
+        if _flag(kwargs, 'ex', 'exists'):
+            return node.has_attr(attr)
+        raise NotImplementedError('attributeQuery only supports exists.')
+
+    def listAttr(self, node, **kwargs):
+        node = self._scene.get(node)
+        if _flag(kwargs, 'ud', 'userDefined'):
+            return list(node.attr_types) or None
+        return list(node.attrs) + list(node.attr_types)
+
+    def _computed_attr(self, node, attr):
+        base = attr.split('[', 1)[0]
+        if base == 'worldMatrix':
+            return self._scene.world_matrix(node)
+        elif base == 'worldInverseMatrix':
+            return matrix_inverse(self._scene.world_matrix(node))
+        elif base == 'matrix':
+            return self._scene.transform_matrix(node)
+        elif base == 'inverseMatrix':
+            return matrix_inverse(self._scene.transform_matrix(node))
+        elif base == 'parentMatrix':
+            return self._scene.parent_matrix(node)
+        elif base == 'parentInverseMatrix':
+            return matrix_inverse(self._scene.parent_matrix(node))
+        elif base in ('boundingBoxMin', 'boundingBoxMax') and node.data.get('points'):
+            pick = min if base == 'boundingBoxMin' else max
+            return [tuple(pick(point[i] for point in node.data['points']) for i in range(3))]
+        return None
+
+    def _shading_connections(self):
+        """
+        Return the instObjGroups connections implied by shading engine members.
+
+        Face assignments use an objectGroups element per shape, whose
+        objectGrpCompList is returned alongside.
+        """
+        connections = []
+        comp_lists = {}
+        group_counts = {}
+        for obj_set in self._scene.nodes.values():
+            if obj_set.type != 'shadingEngine':
+                continue
+            for i, (node, comp_type, indices) in enumerate(obj_set.data.get('members', [])):
+                shape = self._scene.get_shape(node)
+                if comp_type is None:
+                    src_attr = 'instObjGroups[0]'
+                else:
+                    group = group_counts.get(shape, 0)
+                    group_counts[shape] = group + 1
+                    src_attr = 'instObjGroups[0].objectGroups[{}]'.format(group)
+                    comp_lists[(shape, src_attr + '.objectGrpCompList')] = [
+                        '{}[{}]'.format(comp_type, _format_range(start, end))
+                        for start, end in _compact_ranges(indices)
+                    ]
+                connections.append((shape, src_attr, obj_set, 'dagSetMembers[{}]'.format(i)))
+        return connections, comp_lists
+
+    def _default_value(self, node, attr):
+        if node.is_type('weightGeometryFilter') and '.weights[' in attr:
+            return 1.0
+        return None
+
+    def getAttr(self, plug, **kwargs):
+        node, attr = self._split_plug(plug)
+
+        if _flag(kwargs, 'l', 'lock'):
+            return self._resolve_attr(attr)[0] in node.locked
+
+        if attr in ('controlPoints', 'cp') and _flag(kwargs, 's', 'size'):
+            return len(node.data.get('points', []))
+
+        if _flag(kwargs, 'mi', 'multiIndices') or _flag(kwargs, 's', 'size'):
+            prefix = attr + '['
+            keys = list(node.attrs) + [
+                dst_attr for _, _, dst, dst_attr in self._scene.connections if dst is node
+            ]
+            indices = sorted(set(
+                int(key[len(prefix):].split(']', 1)[0])
+                for key in keys
+                if key.startswith(prefix)
+            ))
+            if _flag(kwargs, 's', 'size'):
+                return len(indices)
+            return indices or None
+
+        if _flag(kwargs, 'type'):
+            return node.attr_types.get(attr, type(node.attrs.get(attr)).__name__)
+
+        if attr.endswith('.objectGrpCompList'):
+            return self._shading_connections()[1].get((node, attr))
+
+        computed = self._computed_attr(node, attr)
+        if computed is not None:
+            return computed
+
+        match = INDEX_REGEX.match(attr)
+        if match and match.group('end') is not None:
+            return [
+                self.getAttr('{}.{}[{}]'.format(node.name, match.group('attr'), index))
+                for index in range(int(match.group('start')), int(match.group('end')) + 1)
+            ]
+
+        name, index = self._resolve_attr(attr)
+        if name not in node.attrs:
+            value = self._default_value(node, name)
+            if value is None and not node.has_attr(name):
+                raise ValueError('No object matches name: {}'.format(plug))
+            return value
+
+        value = node.attrs[name]
+        if index is not None:
+            return value[index]
+        if isinstance(value, list) and len(value) == 3:
+            return [tuple(value)]
+        return value
+
+    def setAttr(self, plug, *values, **kwargs):
+        node, attr = self._split_plug(plug)
+        name, index = self._resolve_attr(attr)
+
+        lock = _flag(kwargs, 'l', 'lock')
+        if lock is not None:
+            if lock:
+                node.locked.add(name)
+            else:
+                node.locked.discard(name)
+            if not values:
+                return
+
+        if name in node.locked:
+            raise RuntimeError('The attribute {} is locked.'.format(plug))
+
+        match = INDEX_REGEX.match(name)
+        if match and match.group('end') is not None:
+            start = int(match.group('start'))
+            for offset, value in enumerate(values):
+                node.attrs['{}[{}]'.format(match.group('attr'), start + offset)] = value
+            return
+
+        if index is not None:
+            node.attrs[name][index] = values[0]
+        elif len(values) == 1:
+            node.attrs[name] = values[0]
+        else:
+            node.attrs[name] = list(values)
+
+    # --------------------------------------------------------------------------
+    def connectAttr(self, source, destination, **kwargs):
+        src_node, src_attr = self._split_plug(source)
+        dst_node, dst_attr = self._split_plug(destination)
+        existing = [
+            connection
+            for connection in self._scene.connections
+            if connection[2] is dst_node and connection[3] == dst_attr
+        ]
+        if existing:
+            if not _flag(kwargs, 'f', 'force'):
+                raise RuntimeError('{} is already connected.'.format(destination))
+            for connection in existing:
+                self._scene.connections.remove(connection)
+        self._scene.connections.append((src_node, src_attr, dst_node, dst_attr))
+
+    def disconnectAttr(self, source, destination):
+        src_node, src_attr = self._split_plug(source)
+        dst_node, dst_attr = self._split_plug(destination)
+        self._scene.connections = [
+            connection
+            for connection in self._scene.connections
+            if connection != (src_node, src_attr, dst_node, dst_attr)
+        ]
+
+    def listConnections(self, *items, **kwargs):
+        source = _flag(kwargs, 's', 'source', default=True)
+        destination = _flag(kwargs, 'd', 'destination', default=True)
+        node_type = _flag(kwargs, 't', 'type')
+        plugs = _flag(kwargs, 'p', 'plugs')
+        connections = _flag(kwargs, 'c', 'connections')
+
+        def matches(attr, query):
+            return query is None or attr == query or attr.startswith(query + '[') or attr.startswith(query + '.')
+
+        items = _flatten(items)
+        all_connections = self._scene.connections
+        if any(self._scene.get(item.partition('.')[0]).type in SHAPE_TYPES + ('shadingEngine',) for item in items):
+            all_connections = all_connections + self._shading_connections()[0]
+
+        results = []
+        for item in items:
+            node_name, _, query = item.partition('.')
+            node = self._scene.get(node_name)
+            query = query or None
+            for src, src_attr, dst, dst_attr in all_connections:
+                if destination and src is node and matches(src_attr, query):
+                    this, other, other_attr = '{}.{}'.format(node.name, src_attr), dst, dst_attr
+                elif source and dst is node and matches(dst_attr, query):
+                    this, other, other_attr = '{}.{}'.format(node.name, dst_attr), src, src_attr
+                else:
+                    continue
+                if node_type and not other.is_type(node_type):
+                    continue
+                if connections:
+                    results.append(this)
+                results.append('{}.{}'.format(other.name, other_attr) if plugs else other.name)
+
+        return results or None
+
+    # --------------------------------------------------------------------------
+    def xform(self, *items, **kwargs):
+        items = _flatten(items) or list(self._scene.selection)
+        world = _flag(kwargs, 'ws', 'worldSpace')
+
+        if _flag(kwargs, 'q', 'query'):
+            return self._xform_query(items, world, kwargs)
+
+        for item in items:
+            if COMPONENT_REGEX.match(item):
+                self._xform_components(item, world, kwargs)
+                continue
+
+            node = self._scene.get(item)
+            if _flag(kwargs, 'm', 'matrix') is not None:
+                matrix = list(_flag(kwargs, 'm', 'matrix'))
+                if world:
+                    self._scene.set_world_matrix(node, matrix)
+                else:
+                    node.attrs['translate'], node.attrs['rotate'], node.attrs['scale'] = decompose_matrix(matrix)
+
+            pivot = _flag(kwargs, 'piv', 'pivots')
+            if pivot is not None:
+                if world:
+                    pivot = transform_point(pivot, matrix_inverse(self._scene.world_matrix(node)))
+                node.attrs['rotatePivot'] = list(pivot)
+                node.attrs['scalePivot'] = list(pivot)
+
+            translate = _flag(kwargs, 't', 'translation')
+            rotate = _flag(kwargs, 'ro', 'rotation')
+            scale = _flag(kwargs, 's', 'scale')
+            if world and (translate is not None or rotate is not None):
+                current, current_rotate, current_scale = decompose_matrix(self._scene.world_matrix(node))
+                matrix = compose_matrix(
+                    translate if translate is not None else current,
+                    rotate if rotate is not None else current_rotate,
+                    current_scale,
+                )
+                self._scene.set_world_matrix(node, matrix)
+            else:
+                if translate is not None:
+                    node.attrs['translate'] = list(translate)
+                if rotate is not None:
+                    node.attrs['rotate'] = list(rotate)
+            if scale is not None:
+                node.attrs['scale'] = list(scale)
+
+    def _xform_components(self, item, world, kwargs):
+        translate = _flag(kwargs, 't', 'translation')
+        if translate is None:
+            return
+        for shape, _, indices in self._components([item]):
+            points = shape.data['points']
+            position = list(translate)
+            if world:
+                position = transform_point(position, matrix_inverse(self._scene.world_matrix(shape)))
+            for index in indices:
+                points[index] = list(position)
+
+    def _xform_query(self, items, world, kwargs):
+        if _flag(kwargs, 'bb', 'boundingBox'):
+            return self.exactWorldBoundingBox(items)
+
+        item = items[0]
+        if COMPONENT_REGEX.match(item):
+            results = []
+            for shape, _, indices in self._components(items):
+                matrix = self._scene.world_matrix(shape) if world else IDENTITY
+                for index in indices:
+                    results.extend(transform_point(shape.data['points'][index], matrix))
+            return results
+
+        node = self._scene.get(item)
+        matrix = self._scene.world_matrix(node) if world else self._scene.local_matrix(node)
+        if _flag(kwargs, 'm', 'matrix'):
+            return matrix
+        if _flag(kwargs, 't', 'translation'):
+            return list(matrix[12:15])
+        if _flag(kwargs, 'ro', 'rotation'):
+            return decompose_matrix(matrix)[1] if world else list(node.attrs['rotate'])
+        if _flag(kwargs, 's', 'scale'):
+            return decompose_matrix(matrix)[2] if world else list(node.attrs['scale'])
+        if _flag(kwargs, 'rp', 'rotatePivot', 'sp', 'scalePivot', 'piv', 'pivots'):
+            pivot = node.attrs.get('rotatePivot', [0.0, 0.0, 0.0])
+            if world:
+                return transform_point(pivot, self._scene.world_matrix(node))
+            return list(pivot)
+        raise NotImplementedError('Unsupported xform query: {}'.format(kwargs))
+
+    def exactWorldBoundingBox(self, *items, **kwargs):
+        points = []
+        for item in _flatten(items):
+            node = self._scene.get(item)
+            for each in [node] + list(node.iter_descendants()):
+                if 'points' in each.data:
+                    matrix = self._scene.world_matrix(each)
+                    points.extend(transform_point(point, matrix) for point in each.data['points'])
+            if not points:
+                points.append(self._scene.world_matrix(node)[12:15])
+
+        return [
+            min(point[0] for point in points), min(point[1] for point in points), min(point[2] for point in points),
+            max(point[0] for point in points), max(point[1] for point in points), max(point[2] for point in points),
+        ]
+
+    def move(self, x, y, z, *items, **kwargs):
+        self.xform(items, t=(x, y, z), ws=_flag(kwargs, 'ws', 'worldSpace'))
+
+    def rotate(self, x, y, z, *items, **kwargs):
+        self.xform(items, ro=(x, y, z), ws=_flag(kwargs, 'ws', 'worldSpace'))
+
+    # --------------------------------------------------------------------------
+    def polyEvaluate(self, *items, **kwargs):
+        shape = self._scene.get_shape(_flatten(items)[0])
+        if _flag(kwargs, 'f', 'face'):
+            return len(shape.data.get('counts', []))
+        return len(shape.data.get('points', []))
+
+    def polyCube(self, **kwargs):
+        width = _flag(kwargs, 'w', 'width', default=1.0)
+        height = _flag(kwargs, 'h', 'height', default=1.0)
+        depth = _flag(kwargs, 'd', 'depth', default=1.0)
+        transform, shape = self._scene.create_cube(
+            _flag(kwargs, 'n', 'name') or 'pCube#',
+            width=width,
+            height=height,
+            depth=depth,
+        )
+        creator = self._scene.add_node('polyCube#', 'polyCube')
+        creator.attrs.update({'width': width, 'height': height, 'depth': depth})
+        self._scene.connections.append((creator, 'output', shape, 'inMesh'))
+        return [transform.name, creator.name]
+
+    # --------------------------------------------------------------------------
+    def sets(self, *items, **kwargs):
+        items = _flatten(items)
+        if _flag(kwargs, 'q', 'query'):
+            obj_set = self._scene.get(items[0])
+            results = []
+            for node, comp_type, indices in obj_set.data.get('members', []):
+                if comp_type is None:
+                    results.append(node.name)
+                else:
+                    results.extend(self._component_strings(node, comp_type, indices))
+            return results or None
+
+        is_member = _flag(kwargs, 'im', 'isMember')
+        if is_member:
+            members = self._scene.get(is_member).data.get('members', [])
+            return all(
+                any(member[0] is node and (member[1] is None or set(indices) <= member[2]) for member in members)
+                for node, indices in self._member_items(items)
+            )
+
+        target = _flag(kwargs, 'add', 'addElement', 'fe', 'forceElement')
+        if target:
+            obj_set = self._scene.get(target)
+            if _flag(kwargs, 'fe', 'forceElement'):
+                for other in self._scene.nodes.values():
+                    if other.type == 'shadingEngine' and other is not obj_set:
+                        self._remove_members(other, items)
+            self._add_members(obj_set, items)
+            return
+
+        remove = _flag(kwargs, 'rm', 'remove')
+        if remove:
+            self._remove_members(self._scene.get(remove), items)
+            return
+
+        clear = _flag(kwargs, 'cl', 'clear')
+        if clear:
+            self._scene.get(clear).data['members'] = []
+            return
+
+        node_type = 'shadingEngine' if _flag(kwargs, 'r', 'renderable') else 'objectSet'
+        obj_set = self._scene.add_node(_flag(kwargs, 'n', 'name') or node_type + '#', node_type)
+        obj_set.data['members'] = []
+        if not _flag(kwargs, 'em', 'empty'):
+            self._add_members(obj_set, items or list(self._scene.selection))
+        return obj_set.name
+
+    def _member_items(self, items):
+        results = []
+        for item in items:
+            if COMPONENT_REGEX.match(item):
+                results.extend((shape, indices) for shape, _, indices in self._components([item]))
+            else:
+                results.append((self._scene.get(item), []))
+        return results
+
+    def _set_items(self, obj_set, items):
+        # Shading engines hold the shapes of transforms, through instObjGroups.
+        if obj_set.type != 'shadingEngine':
+            return items
+        return [
+            item if COMPONENT_REGEX.match(item) else self._scene.get_shape(item).name
+            for item in items
+        ]
+
+    def _add_members(self, obj_set, items):
+        members = obj_set.data.setdefault('members', [])
+        for item in self._set_items(obj_set, items):
+            if COMPONENT_REGEX.match(item):
+                for shape, comp_type, indices in self._components([item]):
+                    for member in members:
+                        if member[0] is shape and member[1] == comp_type:
+                            member[2].update(indices)
+                            break
+                    else:
+                        members.append((shape, comp_type, set(indices)))
+            else:
+                node = self._scene.get(item)
+                if obj_set.type == 'shadingEngine':
+                    # The whole shape replaces its face assignments.
+                    members[:] = [member for member in members if member[0] is not node or member[1] is None]
+                if not any(member[0] is node and member[1] is None for member in members):
+                    members.append((node, None, None))
+
+    def _remove_members(self, obj_set, items):
+        members = obj_set.data.get('members', [])
+        for item in self._set_items(obj_set, items):
+            if COMPONENT_REGEX.match(item):
+                for shape, comp_type, indices in self._components([item]):
+                    for i, member in enumerate(members):
+                        if member[0] is shape and member[1] is None and comp_type == 'f':
+                            # Split a whole shape member into its other faces.
+                            members[i] = (shape, 'f', set(range(len(shape.data.get('counts', [])))) - set(indices))
+                        elif member[0] is shape and member[1] == comp_type:
+                            member[2].difference_update(indices)
+            else:
+                node = self._scene.get(item)
+                members[:] = [member for member in members if member[0] is not node]
+        members[:] = [member for member in members if member[1] is None or member[2]]
+
+    # --------------------------------------------------------------------------
+    def cluster(self, *items, **kwargs):
+        name = _flag(kwargs, 'n', 'name') or 'cluster#'
+        components = self._components(_flatten(items) or list(self._scene.selection))
+
+        deformer = self._scene.add_node(name, 'cluster')
+        deformer.attrs['relative'] = bool(_flag(kwargs, 'rel', 'relative'))
+        deformer.data['geometry'] = []
+        obj_set = self._scene.add_node(deformer.name + 'Set', 'objectSet')
+        obj_set.data['members'] = []
+        handle = self._scene.create_transform(deformer.name + 'Handle')
+        self._scene.add_node(handle.name + 'Shape', 'clusterHandle', parent=handle)
+
+        positions = []
+        for shape, comp_type, indices in components:
+            if shape not in deformer.data['geometry']:
+                deformer.data['geometry'].append(shape)
+            matrix = self._scene.world_matrix(shape)
+            positions.extend(transform_point(shape.data['points'][index], matrix) for index in indices)
+            self._add_members(
+                obj_set,
+                self._component_strings(shape, comp_type, indices),
+            )
+
+        if positions:
+            centre = [sum(point[i] for point in positions) / len(positions) for i in range(3)]
+            handle.attrs['rotatePivot'] = list(centre)
+            handle.attrs['scalePivot'] = list(centre)
+            deformer.attrs['origin'] = list(centre)
+
+        self._scene.connections.append((handle, 'worldMatrix[0]', deformer, 'matrix'))
+        self._scene.connections.append((deformer, 'message', obj_set, 'usedBy[0]'))
+        return [deformer.name, handle.name]
+
+    def deformer(self, name, **kwargs):
+        node = self._scene.get(name)
+        geometry = node.data.get('geometry', [])
+        if _flag(kwargs, 'gi', 'geometryIndices'):
+            return list(range(len(geometry)))
+        if _flag(kwargs, 'g', 'geometry'):
+            return [shape.name for shape in geometry]
+        raise NotImplementedError('deformer only supports geometry queries.')
+
+    def percent(self, deformer, *items, **kwargs):
+        node = self._scene.get(deformer)
+        geometry = node.data.get('geometry', [])
+        value = _flag(kwargs, 'v', 'value')
+        results = []
+        for shape, _, indices in self._components(items):
+            geo_index = geometry.index(shape)
+            for index in indices:
+                key = 'weightList[{}].weights[{}]'.format(geo_index, index)
+                if _flag(kwargs, 'q', 'query'):
+                    results.append(node.attrs.get(key, 1.0))
+                else:
+                    node.attrs[key] = value
+        return results or None
+
+    # --------------------------------------------------------------------------
+    def undoInfo(self, **kwargs):
+        if _flag(kwargs, 'q', 'query'):
+            return True
+
+    def refresh(self, **kwargs):
+        pass
+
+    def scriptJob(self, **kwargs):
+        if _flag(kwargs, 'k', 'kill') is not None:
+            self._scene.script_jobs.pop(_flag(kwargs, 'k', 'kill'), None)
+            return
+        if _flag(kwargs, 'ex', 'exists') is not None:
+            return _flag(kwargs, 'ex', 'exists') in self._scene.script_jobs
+        job_id = len(self._scene.script_jobs) + 1
+        while job_id in self._scene.script_jobs:
+            job_id += 1
+        self._scene.script_jobs[job_id] = kwargs
+        return job_id
+
+    def evalDeferred(self, command=None, **kwargs):
+        self._scene.deferred.append(command)
+
+    def getModifiers(self):
+        return 0
+
+    def warning(self, *args):
+        pass
+
+
+@count_calls
+class MemoryMel(object):
+    """maya.mel stand-in, only counts calls."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def eval(self, command):
+        raise NotImplementedError('MEL is not available in the memory backend: {}'.format(command))
+
+
+@count_calls
+class MemoryApi(object):
+    """Bulk geometry access over a MemoryScene."""
+
+    def __init__(self, scene, calls):
+        self._scene = scene
+        self.calls = calls
+
+    def get_points(self, shape, world=False):
+        shape = self._scene.get_shape(shape)
+        points = shape.data['points']
+        if not world:
+            return [list(point) for point in points]
+        matrix = self._scene.world_matrix(shape)
+        return [transform_point(point, matrix) for point in points]
+
+    def set_points(self, shape, points, world=False):
+        shape = self._scene.get_shape(shape)
+        if world:
+            matrix = matrix_inverse(self._scene.world_matrix(shape))
+            points = [transform_point(point, matrix) for point in points]
+        shape.data['points'] = [list(point) for point in points]
+
+    def get_mesh_topology(self, mesh):
+        shape = self._scene.get_shape(mesh)
+        return list(shape.data['counts']), list(shape.data['connects'])
+
+    def snap_transforms(self, pairs, scale=False):
+        world_matrices = [
+            self._scene.world_matrix(self._scene.get(source))
+            for source, _ in pairs
+        ]
+        for (_, target), matrix in zip(pairs, world_matrices):
+            node = self._scene.get(target)
+            current_scale = list(node.attrs['scale'])
+            self._scene.set_world_matrix(node, matrix)
+            if not scale:
+                node.attrs['scale'] = current_scale
+
+    def get_soft_selection(self):
+        return {
+            mesh: (list(indices), list(weights))
+            for mesh, (indices, weights) in self._scene.soft_selection.items()
+        }
+
+
+# ------------------------------------------------------------------------------
+class MemoryBackend(object):
+    name = 'memory'
+
+    def __init__(self, scene=None):
+        self.calls = Counter()
+        self.mel = MemoryMel(self.calls)
+        self.set_scene(scene or MemoryScene())
+
+    def set_scene(self, scene):
+        self.scene = scene
+        self.cmds = MemoryCmds(scene, self.calls)
+        self.api = MemoryApi(scene, self.calls)
+
+    def open_scene(self, path):
+        # Event jobs outlive the scene, as in Maya, and are told it was opened.
+        jobs = dict(
+            (job_id, kwargs)
+            for job_id, kwargs in self.scene.script_jobs.items()
+            if _flag(kwargs, 'e', 'event') and not _flag(kwargs, 'p', 'parent', 'kws', 'killWithScene')
+        )
+        self.set_scene(MemoryScene.load(path))
+        self.scene.path = path
+        self.scene.script_jobs.update(jobs)
+        for kwargs in jobs.values():
+            event, command = _flag(kwargs, 'e', 'event')
+            if event == 'SceneOpened':
+                command()
+
+    def save_scene(self, path=None):
+        path = path or self.scene.path
+        self.scene.save(path)
+        self.scene.path = path
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def flush_deferred(self):
+        """Run all commands queued with evalDeferred."""
+        while self.scene.deferred:
+            command = self.scene.deferred.pop(0)
+            if callable(command):
+                command()
@@ -0,0 +1,339 @@
+"""
+Run ld_tools operations over many scenes in a pool of standalone interpreters.
+
+A manifest lists the jobs to run, each opening a scene, running a single
+operation and optionally saving the result:
+
+    .. code-block:: json
+
+        {
+            "jobs": [
+                {
+                    "scene": "/assets/char_a.ma",
+                    "operation": "deformer_mirror",
+                    "kwargs": {"node": "body", "handle_list": ["L_cheek_clsHandle"], "axis": 1,
+                               "search": "L_", "replace": "R_"},
+                    "save": true
+                }
+            ]
+        }
+
+Operations are either a name from OPERATIONS or a "module:function" path.
+With ``--backend local`` the workers run against the in-memory scene backend,
+opening and saving its json scene files instead of Maya scenes.
+
+The orchestrator needs Python 3, workers only import the standard library
+available to Python 2 mayapy as well.
+
+Usage:
+
+    .. code-block:: bash
+
+        python -m ld_tools.batch manifest.json --jobs 4 --timeout 600 --output results.json
+
+"""
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import traceback
+
+from . import backend as scene_backend
+
+
+LOG = logging.getLogger('ld_tools.batch')
+
+BACKEND_MAYA = 'maya'
+BACKEND_LOCAL = 'local'
+DEFAULT_INTERPRETER = 'mayapy'
+DEFAULT_TIMEOUT = 3600
+RESULT_PREFIX = '__ld_tools_batch_result__:'
+
+OPERATIONS = {
+    'shape_mirror': 'ld_tools.tools.ld_mirror_me:shape_mirror',
+    'mesh_mirror': 'ld_tools.tools.ld_mirror_me:mesh_mirror',
+    'deformer_mirror': 'ld_tools.tools.ld_mirror_me:deformer_mirror',
+    'group_mover': 'ld_tools.tools.ld_group_mover:create_group_mover',
+}
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+STATUS_TIMEOUT = 'timeout'
+
+
+# ------------------------------------------------------------------------------
+def get_operation(name):
+    """
+    Return the callable for the given operation name or "module:function" path.
+
+    :param name: Operation name.
+    :type name: str
+
+    :rtype: callable
+    """
+    path = OPERATIONS.get(name, name)
+    if ':' not in path:
+        raise ValueError('Unknown operation: {}'.format(name))
+
+    module_name, func_name = path.split(':', 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def load_manifest(path):
+    """
+    Return the jobs described by the manifest file.
+
+    :param path: Manifest json file.
+    :type path: str
+
+    :rtype: list(dict)
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    jobs = data['jobs'] if isinstance(data, dict) else data
+    for job in jobs:
+        if 'operation' not in job:
+            raise ValueError('Job is missing an operation: {}'.format(job))
+
+    return jobs
+
+
+# ------------------------------------------------------------------------------
+def run_job(job):
+    """
+    Run a single job in the current interpreter against the active backend.
+
+    :param job: Job description from the manifest.
+    :type job: dict
+
+    :return: Json serialisable job result.
+    :rtype: dict
+    """
+    start = time.time()
+    result = {
+        'scene': job.get('scene'),
+        'operation': job['operation'],
+        'status': STATUS_OK,
+        'result': None,
+        'error': None,
+    }
+
+    try:
+        if job.get('scene'):
+            scene_backend.get_backend().open_scene(job['scene'])
+
+        operation = get_operation(job['operation'])
+        value = operation(*job.get('args', []), **job.get('kwargs', {}))
+
+        if job.get('save'):
+            scene_backend.get_backend().save_scene(job.get('save_as'))
+
+        # Only keep results that can be reported.
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            value = repr(value)
+        result['result'] = value
+
+    except Exception:
+        result['status'] = STATUS_ERROR
+        result['error'] = traceback.format_exc()
+
+    result['duration'] = time.time() - start
+    return result
+
+
+def _initialise(backend):
+    if backend == BACKEND_MAYA:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        scene_backend.set_backend(scene_backend.BACKEND_MAYA)
+    else:
+        scene_backend.set_backend(scene_backend.BACKEND_MEMORY)
+
+
+def _uninitialise(backend):
+    if backend == BACKEND_MAYA:
+        import maya.standalone
+        maya.standalone.uninitialize()
+
+
+def worker_main(backend=BACKEND_MAYA):
+    """Run the job read from stdin and write its result to stdout."""
+    job = json.loads(sys.stdin.read())
+    _initialise(backend)
+    try:
+        result = run_job(job)
+    finally:
+        _uninitialise(backend)
+
+    # Standalone sessions can print freely, so tag the result line.
+    sys.stdout.write('\n' + RESULT_PREFIX + json.dumps(result) + '\n')
+    sys.stdout.flush()
+
+
+# ------------------------------------------------------------------------------
+def _get_worker_env():
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = [root] + [path for path in env.get('PYTHONPATH', '').split(os.pathsep) if path]
+    env['PYTHONPATH'] = os.pathsep.join(paths)
+    return env
+
+
+def _parse_worker_output(output):
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return None
+
+
+def run_job_process(job, interpreter=DEFAULT_INTERPRETER, backend=BACKEND_MAYA, timeout=DEFAULT_TIMEOUT):
+    """
+    Run a single job in a new interpreter process.
+
+    :param job: Job description from the manifest.
+    :type job: dict
+    :param interpreter: Interpreter executable, ie mayapy.
+    :type interpreter: str
+    :param backend: Scene backend the worker runs against.
+    :type backend: str
+    :param timeout: Seconds before the worker is killed. Overridden by the
+        job's own "timeout".
+    :type timeout: float
+
+    :return: Json serialisable job result.
+    :rtype: dict
+    """
+    timeout = job.get('timeout', timeout)
+    start = time.time()
+    process = subprocess.Popen(
+        [interpreter, '-m', 'ld_tools.batch', '--worker', '--backend', backend],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=_get_worker_env(),
+        universal_newlines=True,
+    )
+
+    try:
+        output, errors = process.communicate(json.dumps(job), timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return {
+            'scene': job.get('scene'),
+            'operation': job['operation'],
+            'status': STATUS_TIMEOUT,
+            'result': None,
+            'error': 'Timed out after {}s'.format(timeout),
+            'duration': time.time() - start,
+        }
+
+    result = _parse_worker_output(output)
+    if result is None:
+        result = {
+            'scene': job.get('scene'),
+            'operation': job['operation'],
+            'status': STATUS_ERROR,
+            'result': None,
+            'error': errors or 'Worker exited with code {}'.format(process.returncode),
+            'duration': time.time() - start,
+        }
+
+    return result
+
+
+def run_batch(jobs, processes=None, interpreter=DEFAULT_INTERPRETER, backend=BACKEND_MAYA,
+              timeout=DEFAULT_TIMEOUT):
+    """
+    Run all jobs across a pool of interpreter processes.
+
+    :param jobs: Job descriptions from the manifest.
+    :type jobs: list(dict)
+    :param processes: Maximum concurrent processes. Cpu count if None given.
+    :type processes: int / None
+    :param interpreter: Interpreter executable, ie mayapy.
+    :type interpreter: str
+    :param backend: Scene backend the workers run against.
+    :type backend: str
+    :param timeout: Default seconds before a worker is killed.
+    :type timeout: float
+
+    :return: Result per job, in manifest order.
+    :rtype: list(dict)
+    """
+    # Orchestrator only, keeps Python 2 workers importing this module.
+    from concurrent.futures import ThreadPoolExecutor
+
+    processes = processes or multiprocessing.cpu_count()
+    with ThreadPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                run_job_process,
+                job,
+                interpreter=interpreter,
+                backend=backend,
+                timeout=timeout,
+            )
+            for job in jobs
+        ]
+        results = []
+        for future in futures:
+            result = future.result()
+            LOG.info('{} {} [{}]'.format(result['operation'], result['scene'], result['status']))
+            results.append(result)
+
+    return results
+
+
+# ------------------------------------------------------------------------------
+def _get_parser():
+    parser = argparse.ArgumentParser(prog='ld_tools.batch', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('manifest', nargs='?', help='Json manifest of jobs to run.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Concurrent processes.')
+    parser.add_argument('-t', '--timeout', type=float, default=DEFAULT_TIMEOUT, help='Seconds per job.')
+    parser.add_argument('-i', '--interpreter', default=DEFAULT_INTERPRETER, help='Worker interpreter.')
+    parser.add_argument('-b', '--backend', default=BACKEND_MAYA, choices=(BACKEND_MAYA, BACKEND_LOCAL))
+    parser.add_argument('-o', '--output', help='Write results to this json file.')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = _get_parser().parse_args(argv)
+    if args.worker:
+        worker_main(backend=args.backend)
+        return 0
+
+    if not args.manifest:
+        _get_parser().error('A manifest is required.')
+
+    logging.basicConfig(level=logging.INFO)
+    results = run_batch(
+        load_manifest(args.manifest),
+        processes=args.jobs,
+        interpreter=args.interpreter,
+        backend=args.backend,
+        timeout=args.timeout,
+    )
+
+    data = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data)
+    else:
+        sys.stdout.write(data + '\n')
+
+    return int(any(result['status'] != STATUS_OK for result in results))
+
+
+# ------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Bulk read and write helpers for weightGeometryFilter deformers.
+
+Usage:
+
+    .. code-block:: python
+
+        >>> from ld_tools import deformers
+        >>> deformers.get_weights('cluster1')
+        >>> deformers.set_weights('cluster1', {'pSphere1': ([0, 1, 2], [1.0, 0.5, 0.25])})
+
+"""
+from array import array
+import logging
+import re
+
+from .backend import cmds as mc
+
+
+LOG = logging.getLogger('ld_tools.deformers')
+
+COMPONENT_REGEX = re.compile(r'^(?P<node>.+)\.(?P<type>\w+)\[(?P<start>\d+)(?::(?P<end>\d+))?\]$')
+
+# Weight of points without a stored weight.
+DEFAULT_WEIGHT = 1.0
+
+# Component type of whole shape members, per supported shape type. Surfaces
+# and lattices use multi-index components, which are not supported.
+COMPONENT_TYPES = {
+    'mesh': 'vtx',
+    'nurbsCurve': 'cv',
+}
+
+
+# ------------------------------------------------------------------------------
+def split_component(component):
+    """
+    Split a single indexed component into its node, type and index range.
+
+    :param component: Component, ie "pSphere1.vtx[3]" or "pSphere1.vtx[0:5]".
+    :type component: str
+
+    :return: Node, component type, first and last index. None if not a single
+        indexed component.
+    :rtype: tuple(str, str, int, int) / None
+    """
+    match = COMPONENT_REGEX.match(component)
+    if not match:
+        return None
+
+    start = int(match.group('start'))
+    end = int(match.group('end') or start)
+    return match.group('node'), match.group('type'), start, end
+
+
+def group_component_weights(components, weights):
+    """
+    Group matching lists of single vertex components and weights by node.
+
+    :param components: Single vertex components.
+    :type components: list(str)
+    :param weights: Weight per component.
+    :type weights: list(float)
+
+    :return: Index and weight lists per node.
+    :rtype: dict(str, tuple(list(int), list(float)))
+    """
+    results = {}
+    for component, weight in zip(components, weights):
+        node, _, index, _ = split_component(component)
+        indices, values = results.setdefault(node, ([], []))
+        indices.append(index)
+        values.append(weight)
+    return results
+
+
+def _iter_runs(indices):
+    """Yield (first, last) for each contiguous run of sorted indices."""
+    start = previous = None
+    for index in indices:
+        if start is None:
+            start = previous = index
+        elif index == previous + 1:
+            previous = index
+        else:
+            yield start, previous
+            start = previous = index
+
+    if start is not None:
+        yield start, previous
+
+
+def to_components(node, indices, component_type='vtx'):
+    """
+    Return compact component ranges covering the given indices.
+
+    :param node: Node owning the components.
+    :type node: str
+    :param indices: Component indices.
+    :type indices: list(int)
+    :param component_type: Component type, ie "vtx" or "cv".
+    :type component_type: str
+
+    :rtype: list(str)
+    """
+    return [
+        '{}.{}[{}:{}]'.format(node, component_type, start, end)
+        for start, end in _iter_runs(sorted(set(indices)))
+    ]
+
+
+# ------------------------------------------------------------------------------
+def _get_transform(node):
+    if mc.nodeType(node) != 'transform':
+        node = mc.listRelatives(node, parent=True, fullPath=True)[0]
+
+    return mc.ls(node, long=True)[0]
+
+
+def get_geometry_indices(deformer):
+    """
+    Return the deformer geometry index of each deformed mesh.
+
+    :param deformer: Deformer node.
+    :type deformer: str
+
+    :return: Geometry index per transform long name.
+    :rtype: dict(str, int)
+    """
+    shapes = mc.deformer(deformer, q=True, geometry=True) or []
+    indices = mc.deformer(deformer, q=True, geometryIndices=True) or []
+    return {
+        _get_transform(shape): index
+        for shape, index in zip(shapes, indices)
+    }
+
+
+def _get_shape_type(node):
+    if mc.nodeType(node) != 'transform':
+        return mc.nodeType(node)
+
+    shapes = mc.listRelatives(node, shapes=True, noIntermediate=True, fullPath=True) or []
+    return mc.nodeType(shapes[0]) if shapes else None
+
+
+def _get_point_count(node):
+    if _get_shape_type(node) == 'mesh':
+        return mc.polyEvaluate(node, vertex=True)
+
+    return mc.getAttr(node + '.controlPoints', size=True)
+
+
+def _get_members(deformer, meshes=None):
+    """
+    Return the member component type and indices of the deformer per mesh.
+
+    Only mesh vertices and curve CVs are read, members of other shapes are
+    skipped with a warning.
+    """
+    obj_set = mc.listConnections(deformer, type='objectSet')[0]
+    if meshes is not None:
+        meshes = set(_get_transform(mesh) for mesh in meshes)
+
+    transforms = {}
+    results = {}
+    for member in mc.sets(obj_set, q=True) or []:
+        split = split_component(member)
+        if not split and '.' in member:
+            LOG.warning('Skipping unsupported component: {}'.format(member))
+            continue
+
+        node = split[0] if split else member
+        shape_type = None if split else _get_shape_type(node)
+        if not split and shape_type not in COMPONENT_TYPES:
+            LOG.warning('Skipping unsupported shape: {}'.format(node))
+            continue
+
+        if node not in transforms:
+            transforms[node] = _get_transform(node)
+
+        transform = transforms[node]
+        if meshes is not None and transform not in meshes:
+            continue
+
+        if split:
+            component_type = split[1]
+            indices = range(split[2], split[3] + 1)
+        else:
+            component_type = COMPONENT_TYPES[shape_type]
+            indices = range(_get_point_count(node))
+
+        results.setdefault(transform, (component_type, set()))[1].update(indices)
+
+    return {
+        transform: (component_type, sorted(indices))
+        for transform, (component_type, indices) in results.items()
+    }
+
+
+def get_members(deformer, meshes=None):
+    """
+    Return the member component indices of the deformer set per mesh.
+
+    Members are read from the compact ranges stored on the deformer set,
+    without expanding them to one string per component. Only mesh vertices and
+    curve CVs are supported.
+
+    :param deformer: Deformer node.
+    :type deformer: str
+    :param meshes: Only return members of these meshes. All if None given.
+    :type meshes: list(str) / None
+
+    :return: Sorted member indices per transform long name.
+    :rtype: dict(str, list(int))
+    """
+    return {
+        transform: indices
+        for transform, (_, indices) in _get_members(deformer, meshes=meshes).items()
+    }
+
+
+def get_weights(deformer, meshes=None):
+    """
+    Return the member indices and weights of the deformer per mesh.
+
+    Weights are queried with one percent command per mesh, and returned as
+    compact int32 / float32 arrays.
+
+    :param deformer: Deformer node.
+    :type deformer: str
+    :param meshes: Only return weights of these meshes. All if None given.
+    :type meshes: list(str) / None
+
+    :return: Index and weight arrays per transform long name.
+    :rtype: dict(str, tuple(array.array, array.array))
+    """
+    results = {}
+    for transform, (component_type, indices) in _get_members(deformer, meshes=meshes).items():
+        components = to_components(transform, indices, component_type)
+        weights = mc.percent(deformer, components, q=True, v=True) or []
+        results[transform] = (array('i', indices), array('f', weights))
+    return results
+
+
+def set_weights(deformer, weights_by_mesh):
+    """
+    Set the weights of a weightGeometryFilter deformer in bulk.
+
+    Each mesh is written with a single setAttr over the range of its indices,
+    rather than one percent command per component. Indices within the range
+    missing from the lists are set to DEFAULT_WEIGHT. Only members are
+    deformed, so this only matters for members that are left out.
+
+    :param deformer: Deformer node, ie a cluster.
+    :type deformer: str
+    :param weights_by_mesh: Index and weight lists per deformed mesh.
+    :type weights_by_mesh: dict(str, tuple(list(int), list(float)))
+    """
+    geometry_indices = get_geometry_indices(deformer)
+    for mesh, (indices, weights) in weights_by_mesh.items():
+        if not len(indices):
+            continue
+
+        attr = '{}.weightList[{}].weights'.format(
+            deformer,
+            geometry_indices[_get_transform(mesh)],
+        )
+        start = min(indices)
+        values = [DEFAULT_WEIGHT] * (max(indices) - start + 1)
+        for index, weight in zip(indices, weights):
+            values[index - start] = weight
+
+        mc.setAttr(
+            '{}[{}:{}]'.format(attr, start, start + len(values) - 1),
+            *values,
+            size=len(values)
+        )
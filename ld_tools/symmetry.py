@@ -0,0 +1,363 @@
+"""
+Vertex symmetry lookup using a uniform hash grid.
+
+Usage:
+
+    .. code-block:: python
+
+        >>> from ld_tools import symmetry
+        >>> symmetry.build_symmetry_map(points, axis=1)
+        >>> symmetry.get_symmetry_map('pSphere1', axis=1)
+
+"""
+from array import array
+from collections import OrderedDict, defaultdict
+import hashlib
+import json
+import math
+
+from .backend import cmds as mc
+
+from . import utils
+
+
+SYMMETRY_MAP_ATTR = 'ld_symmetry_map'
+CACHE_SIZE = 32
+
+
+# ------------------------------------------------------------------------------
+def _get_cell_size(points):
+    """
+    Return a grid cell size giving roughly one point per cell.
+
+    :param points: Point positions.
+    :type points: list(list(float, float, float))
+
+    :rtype: float
+    """
+    extents = [
+        max(point[i] for point in points) - min(point[i] for point in points)
+        for i in range(3)
+    ]
+    extents = [extent for extent in extents if extent > 0.0]
+    if not extents:
+        return 1.0
+
+    volume = 1.0
+    for extent in extents:
+        volume *= extent
+
+    return (volume / len(points)) ** (1.0 / len(extents))
+
+
+def _get_cell(point, cell_size):
+    return (
+        int(math.floor(point[0] / cell_size)),
+        int(math.floor(point[1] / cell_size)),
+        int(math.floor(point[2] / cell_size)),
+    )
+
+
+def _iter_shell(cell, radius):
+    """Yield every cell at exactly the given chebyshev distance from cell."""
+    if not radius:
+        yield cell
+        return
+
+    x, y, z = cell
+    span = range(-radius, radius + 1)
+    for i in span:
+        for j in span:
+            if abs(i) == radius or abs(j) == radius:
+                for k in span:
+                    yield x + i, y + j, z + k
+            else:
+                yield x + i, y + j, z - radius
+                yield x + i, y + j, z + radius
+
+
+# ------------------------------------------------------------------------------
+class PointGrid(object):
+    """Uniform hash grid for nearest point queries."""
+
+    def __init__(self, points, cell_size=None):
+        self.points = points
+        self.cell_size = cell_size or _get_cell_size(points)
+        self.cells = defaultdict(list)
+        for index, point in enumerate(points):
+            self.cells[_get_cell(point, self.cell_size)].append(index)
+
+        cell_indices = list(self.cells) or [(0, 0, 0)]
+        self.cell_min = [min(cell[i] for cell in cell_indices) for i in range(3)]
+        self.cell_max = [max(cell[i] for cell in cell_indices) for i in range(3)]
+
+    def _get_max_radius(self, cell):
+        return max(
+            max(abs(cell[i] - self.cell_min[i]), abs(cell[i] - self.cell_max[i]))
+            for i in range(3)
+        )
+
+    def nearest(self, position):
+        """
+        Return the index of the point closest to position.
+
+        :param position: Position to query.
+        :type position: list(float, float, float)
+
+        :return: Closest point index or -1 if the grid is empty.
+        :rtype: int
+        """
+        cell = _get_cell(position, self.cell_size)
+        points = self.points
+        cells = self.cells
+        px, py, pz = position
+
+        best_index = -1
+        best_distance = float('inf')
+        for radius in range(self._get_max_radius(cell) + 1):
+            # Any point in this shell or beyond is at least this far away.
+            if best_index != -1 and best_distance <= ((radius - 1) * self.cell_size) ** 2:
+                break
+
+            for shell_cell in _iter_shell(cell, radius):
+                for index in cells.get(shell_cell, ()):
+                    point = points[index]
+                    distance = (point[0] - px) ** 2 + (point[1] - py) ** 2 + (point[2] - pz) ** 2
+                    if distance < best_distance:
+                        best_index = index
+                        best_distance = distance
+
+        return best_index
+
+
+# ------------------------------------------------------------------------------
+def mirror_point(point, axis):
+    """
+    Return a copy of point mirrored across the given axis.
+
+    :param point: Position to mirror.
+    :type point: list(float, float, float)
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+
+    :rtype: list(float, float, float)
+    """
+    result = list(point)
+    result[axis - 1] *= -1
+    return result
+
+
+def build_symmetry_map(points, axis, indices=None):
+    """
+    Return the mirrored point index for each requested point index.
+
+    The grid is built once from all points and every mirrored position is
+    resolved against it, so cost is O(n) rather than one mesh query per point.
+
+    :param points: Objectspace point positions.
+    :type points: list(list(float, float, float))
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+    :param indices: Point indices to resolve. All points if None given.
+    :type indices: list(int) / None
+
+    :return: Mirrored index per requested index.
+    :rtype: list(int)
+    """
+    if not points:
+        return []
+
+    grid = PointGrid(points)
+    if indices is None:
+        indices = range(len(points))
+
+    return [grid.nearest(mirror_point(points[index], axis)) for index in indices]
+
+
+def is_symmetric(points, symmetry_map, axis, tolerance=1e-3):
+    """
+    Return whether the symmetry map is a one to one mirror of the points.
+
+    :param points: Objectspace point positions.
+    :type points: list(list(float, float, float))
+    :param symmetry_map: Mirrored index per point index.
+    :type symmetry_map: list(int)
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+    :param tolerance: Maximum distance between a mirrored point and its match.
+    :type tolerance: float
+
+    :rtype: bool
+    """
+    if len(symmetry_map) != len(points):
+        return False
+
+    tolerance *= tolerance
+    for index, mirror_index in enumerate(symmetry_map):
+        if symmetry_map[mirror_index] != index:
+            return False
+
+        point = mirror_point(points[index], axis)
+        other = points[mirror_index]
+        distance = (point[0] - other[0]) ** 2 + (point[1] - other[1]) ** 2 + (point[2] - other[2]) ** 2
+        if distance > tolerance:
+            return False
+
+    return True
+
+
+# ------------------------------------------------------------------------------
+class SymmetryCache(object):
+    """Least recently used cache of symmetry maps."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._data = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        value = self._data.pop(key, None)
+        if value is not None:
+            self._data[key] = value
+        return value
+
+    def set(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+CACHE = SymmetryCache()
+
+
+def _to_bytes(values):
+    values = array('i', values)
+    # Python 2 arrays only have tostring.
+    if hasattr(values, 'tobytes'):
+        return values.tobytes()
+    return values.tostring()
+
+
+def get_topology_fingerprint(mesh):
+    """
+    Return a hash identifying the topology of the mesh.
+
+    :param mesh: Mesh shape or transform.
+    :type mesh: str
+
+    :rtype: str
+    """
+    counts, connects = utils.get_mesh_topology(mesh)
+    digest = hashlib.md5(_to_bytes(counts))
+    digest.update(_to_bytes(connects))
+    return digest.hexdigest()
+
+
+def _get_cache_key(fingerprint, axis):
+    return '{}:{}'.format(fingerprint, axis)
+
+
+def _get_mesh_shape(mesh):
+    if mc.nodeType(mesh) == 'mesh':
+        return mesh
+
+    return mc.listRelatives(mesh, shapes=True, type='mesh', noIntermediate=True, fullPath=True)[0]
+
+
+def _get_base_shape(shape):
+    """Return the undeformed shape of the mesh, the shape itself if not deformed."""
+    parent = mc.listRelatives(shape, parent=True, fullPath=True)
+    shapes = mc.listRelatives(parent, shapes=True, type='mesh', fullPath=True) if parent else None
+    for other in shapes or []:
+        if other == shape or not mc.getAttr(other + '.intermediateObject'):
+            continue
+
+        # The original shape of a deformer chain has no input.
+        if not mc.listConnections(other + '.inMesh', source=True, destination=False):
+            return other
+
+    return shape
+
+
+def _read_stored_maps(shape):
+    if not mc.attributeQuery(SYMMETRY_MAP_ATTR, n=shape, ex=True):
+        return {}
+
+    return json.loads(mc.getAttr(shape + '.' + SYMMETRY_MAP_ATTR) or '{}')
+
+
+def _write_stored_maps(shape, data):
+    if not mc.attributeQuery(SYMMETRY_MAP_ATTR, n=shape, ex=True):
+        mc.addAttr(shape, ln=SYMMETRY_MAP_ATTR, dt='string')
+
+    mc.setAttr(shape + '.' + SYMMETRY_MAP_ATTR, json.dumps(data), type='string')
+
+
+def get_symmetry_map(mesh, axis, store=True, tolerance=1e-3):
+    """
+    Return the full symmetry map of the mesh, building it only when not cached.
+
+    Maps are built from the undeformed points of the mesh. Only maps passing
+    is_symmetric are cached and stored, keyed by topology fingerprint and axis,
+    so any mesh sharing the same topology reuses them. Lookup order is the
+    in-memory cache, then the map stored on the mesh shape, then a fresh build.
+
+    Maps of asymmetric meshes are rebuilt on every call and only match each
+    point to its closest mirrored point.
+
+    :param mesh: Mesh shape or transform.
+    :type mesh: str
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+    :param store: Store newly built maps on the mesh shape.
+    :type store: bool
+    :param tolerance: Maximum distance between a mirrored point and its match
+        for the map to be cached.
+    :type tolerance: float
+
+    :return: Mirrored vertex index per vertex index.
+    :rtype: list(int)
+    """
+    shape = _get_mesh_shape(mesh)
+    key = _get_cache_key(get_topology_fingerprint(shape), axis)
+
+    symmetry_map = CACHE.get(key)
+    if symmetry_map is not None:
+        return symmetry_map
+
+    points = utils.get_points(_get_base_shape(shape))
+    stored = _read_stored_maps(shape)
+    symmetry_map = stored.get(key)
+    if symmetry_map is not None and is_symmetric(points, symmetry_map, axis, tolerance):
+        CACHE.set(key, symmetry_map)
+        return symmetry_map
+
+    symmetry_map = build_symmetry_map(points, axis)
+    if not is_symmetric(points, symmetry_map, axis, tolerance):
+        if store and key in stored:
+            # Drop the outdated map.
+            del stored[key]
+            _write_stored_maps(shape, stored)
+        return symmetry_map
+
+    if store:
+        # Only keep maps matching the current topology.
+        stored = {
+            stored_key: value
+            for stored_key, value in stored.items()
+            if stored_key.split(':', 1)[0] == key.split(':', 1)[0]
+        }
+        stored[key] = symmetry_map
+        _write_stored_maps(shape, stored)
+
+    CACHE.set(key, symmetry_map)
+    return symmetry_map
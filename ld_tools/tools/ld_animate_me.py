@@ -1,7 +1,7 @@
 from functools import wraps
 import logging
 
-import maya.cmds as mc
+from ..backend import cmds as mc
 
 
 __author__ = 'Lee Dunham'
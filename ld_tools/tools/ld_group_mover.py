@@ -1,7 +1,6 @@
 from functools import partial
 
-import maya.cmds as mc
-
+from ..backend import cmds as mc
 from .. import utils
 
 
@@ -11,76 +10,404 @@ __version__ = '1.2.0'
 
 GROUPMOVER_ID_ATTR = 'ld_group_mover'
 GROUPMOVER_TGT_SOURCE_ATTR = 'ld_group_mover_source'
+GROUPMOVER_MODE_ATTR = 'ld_group_mover_mode'
+GROUPMOVER_REGISTRY = 'ld_group_mover_registry'
+GROUPMOVER_OPM_INPUT_ATTR = 'ld_group_mover_opm_input'
+GROUPMOVER_OPM_VALUE_ATTR = 'ld_group_mover_opm'
+
+MODE_CALLBACK = 'callback'
+MODE_NATIVE = 'native'
+
+_TARGET_CACHE = {}
+_PENDING_MOVES = set()
+_SCENE_JOBS = []
 
 
 # ------------------------------------------------------------------------------
+def _get_registry(create=False):
+    if mc.objExists(GROUPMOVER_REGISTRY):
+        return GROUPMOVER_REGISTRY
+    if create:
+        return mc.sets(n=GROUPMOVER_REGISTRY, empty=True)
+    return None
+
+
+def register(movers):
+    """
+    Add the movers to the scene registry.
+
+    :param movers: Group movers.
+    :type movers: str / list(str)
+    """
+    mc.sets(utils.ensure_iterable(movers), add=_get_registry(create=True))
+
+
 def find_group_movers():
-    return mc.ls(
+    """
+    Return all registered group movers.
+
+    Deleted movers drop out of the registry set automatically.
+
+    :rtype: list(str)
+    """
+    registry = _get_registry()
+    if not registry:
+        return []
+    return mc.sets(registry, q=True) or []
+
+
+def _scan_group_movers():
+    movers = mc.ls(
         '.' + GROUPMOVER_ID_ATTR,
         type='transform',
         objectsOnly=True,
         recursive=True,
     )
 
+    # Older movers were never tagged, find them through their sources.
+    sources = mc.ls(
+        '.' + GROUPMOVER_TGT_SOURCE_ATTR,
+        type='transform',
+        objectsOnly=True,
+        recursive=True,
+    )
+    if sources:
+        movers.extend(mc.listRelatives(sources, parent=True, path=True) or [])
 
-@utils.UndoChunk()
-def move(mover):
-    to_delete = []
-    for child in mc.listRelatives(mover, c=True, path=True):
-        if not mc.attributeQuery(GROUPMOVER_TGT_SOURCE_ATTR, n=child, ex=True):
-            continue
+    return list(set(movers))
+
+
+def rebuild_registry():
+    """
+    Register every group mover in the scene, for scenes without a registry.
+
+    This scans the whole scene, so is only needed once per older scene.
 
+    :return: Registered group movers.
+    :rtype: list(str)
+    """
+    movers = _scan_group_movers()
+    for mover in movers:
+        if not mc.attributeQuery(GROUPMOVER_ID_ATTR, n=mover, ex=True):
+            mc.addAttr(mover, ln=GROUPMOVER_ID_ATTR, at='message')
+
+    registry = _get_registry(create=True)
+    mc.sets(clear=registry)
+    if movers:
+        register(movers)
+    return movers
+
+
+def _build_targets(mover):
+    """
+    Return the (source, target) pairs of the mover, deleting obsolete sources.
+
+    :param mover: Group mover.
+    :type mover: str
+
+    :rtype: list(tuple(str, str))
+    """
+    pairs = []
+    to_delete = []
+    for child in _get_sources(mover):
         target = mc.listConnections(child + '.' + GROUPMOVER_TGT_SOURCE_ATTR, destination=False)
         if not target:
             to_delete.append(child)
             continue
 
-        utils.xform_snap(target, child, worldspace=True)
+        pairs.append((child, target[0]))
 
     # Cleanup obsolete sources.
     if to_delete:
-        mc.delete(to_delete)
+        mc.delete(_get_source_networks(to_delete) + to_delete)
+
+    return pairs
+
+
+def get_targets(mover, refresh=False):
+    """
+    Return the cached (source, target) pairs of the mover.
+
+    :param mover: Group mover.
+    :type mover: str
+    :param refresh: Rebuild the cached pairs.
+    :type refresh: bool
+
+    :rtype: list(tuple(str, str))
+    """
+    if refresh or mover not in _TARGET_CACHE:
+        _setup_scene_jobs()
+        _TARGET_CACHE[mover] = _build_targets(mover)
+    return _TARGET_CACHE[mover]
+
+
+def invalidate_cache(mover=None):
+    """
+    Clear the cached targets of the mover, or of all movers if None given.
+
+    :param mover: Group mover.
+    :type mover: str / None
+    """
+    if mover is None:
+        _TARGET_CACHE.clear()
+    else:
+        _TARGET_CACHE.pop(mover, None)
+
+
+def _clear_scene_caches():
+    _TARGET_CACHE.clear()
+    _PENDING_MOVES.clear()
+
+
+def _setup_scene_jobs():
+    """Clear the cached targets whenever a scene is opened or a new one created."""
+    if _SCENE_JOBS:
+        return
+
+    for event in ('SceneOpened', 'NewSceneOpened'):
+        _SCENE_JOBS.append(mc.scriptJob(event=[event, _clear_scene_caches]))
+
+
+def get_mode(mover):
+    """
+    Return how the mover drives its targets.
+
+    :param mover: Group mover.
+    :type mover: str
+
+    :return: MODE_CALLBACK or MODE_NATIVE.
+    :rtype: str
+    """
+    if mc.attributeQuery(GROUPMOVER_MODE_ATTR, n=mover, ex=True):
+        return mc.getAttr(mover + '.' + GROUPMOVER_MODE_ATTR) or MODE_CALLBACK
+    return MODE_CALLBACK
+
+
+def cleanup(movers=None):
+    """
+    Delete obsolete sources, and their matrix networks, of the movers.
+
+    :param movers: Group movers. All if None given.
+    :type movers: list(str) / None
+    """
+    for mover in utils.ensure_iterable(movers or find_group_movers()):
+        get_targets(mover, refresh=True)
+
+
+@utils.UndoChunk()
+def move(mover):
+    # Native movers are evaluated by the DG, only cleanup is needed.
+    if get_mode(mover) == MODE_NATIVE:
+        get_targets(mover, refresh=True)
+        return
+
+    try:
+        utils.matrix_snap(get_targets(mover))
+
+    except (ValueError, RuntimeError):
+        # A cached node was deleted or renamed, rebuild and try again.
+        utils.matrix_snap(get_targets(mover, refresh=True))
+
+
+def _flush_moves():
+    movers = list(_PENDING_MOVES)
+    _PENDING_MOVES.clear()
+    for mover in movers:
+        if mc.objExists(mover):
+            move(mover)
+        else:
+            invalidate_cache(mover)
+
+
+def request_move(mover, *_):
+    """
+    Queue a move of the mover, collapsing repeated requests until idle.
+
+    :param mover: Group mover.
+    :type mover: str
+    """
+    if mover in _PENDING_MOVES:
+        return
+
+    if not _PENDING_MOVES:
+        mc.evalDeferred(_flush_moves, lowestPriority=True)
+    _PENDING_MOVES.add(mover)
 
 
 def setup_callbacks(mover):
-    mc.scriptJob(
-        attributeChange=[mover + '.t', partial(move, mover)],
-        parent=mover,
-    )
-    mc.scriptJob(
-        attributeChange=[mover + '.r', partial(move, mover)],
-        parent=mover,
-    )
-    mc.scriptJob(
-        attributeChange=[mover + '.s', partial(move, mover)],
-        parent=mover,
-    )
+    for attr in ('t', 'r', 's'):
+        mc.scriptJob(
+            attributeChange=[mover + '.' + attr, partial(request_move, mover)],
+            parent=mover,
+        )
 
 
 # ------------------------------------------------------------------------------
+def create_group_mover_sources(node_list, parent=None):
+    """
+    Create a hidden source for each node, batching the commands across nodes.
+
+    :param node_list: Nodes to create sources for.
+    :type node_list: list(str)
+    :param parent: Node to create the sources under.
+    :type parent: str / None
+
+    :return: New sources, in node order.
+    :rtype: list(str)
+    """
+    kwargs = {'p': parent} if parent else {}
+    sources = [
+        mc.createNode('transform', n=node + '__group_mover_tgt', skipSelect=True, **kwargs)
+        for node in node_list
+    ]
+    if not sources:
+        return sources
+
+    mc.hide(sources)
+    mc.addAttr(sources, ln=GROUPMOVER_TGT_SOURCE_ATTR, at='message')
+    for node, source in zip(node_list, sources):
+        mc.connectAttr(node + '.message', source + '.' + GROUPMOVER_TGT_SOURCE_ATTR)
+
+    return sources
+
+
 def create_group_mover_source(node):
-    group_mover = mc.createNode('transform', n=node + '__group_mover_tgt')
-    mc.setAttr(group_mover + '.visibility', 0)
+    return create_group_mover_sources([node])[0]
 
-    mc.addAttr(group_mover, ln=GROUPMOVER_TGT_SOURCE_ATTR, at='message')
-    mc.connectAttr(node + '.message', group_mover + '.' + GROUPMOVER_TGT_SOURCE_ATTR)
 
-    return group_mover
+def _connect_source(source, target):
+    """
+    Drive the offsetParentMatrix of the target from the source.
+
+    The translate, rotate and scale of the target are left free, so animation
+    and constraints keep working on top of the mover. Any existing
+    offsetParentMatrix input or value is stored on the source to be restored.
+
+    .. note::
+        Requires Maya 2020 or newer.
+
+    :param source: Group mover source.
+    :type source: str
+    :param target: Node to drive.
+    :type target: str
+
+    :return: Created network nodes.
+    :rtype: list(str)
+    """
+    mc.addAttr(source, ln=GROUPMOVER_OPM_INPUT_ATTR, dt='string')
+    mc.addAttr(source, ln=GROUPMOVER_OPM_VALUE_ATTR, dt='matrix')
+    inputs = mc.listConnections(target + '.offsetParentMatrix', source=True, destination=False, plugs=True)
+    if inputs:
+        mc.setAttr(source + '.' + GROUPMOVER_OPM_INPUT_ATTR, inputs[0], type='string')
+    mc.setAttr(
+        source + '.' + GROUPMOVER_OPM_VALUE_ATTR,
+        mc.getAttr(target + '.offsetParentMatrix'),
+        type='matrix',
+    )
+
+    # Cancel the current local transform, so the target world matrix follows
+    # the source: local * local_at_creation^-1 * source * parent^-1 * parent.
+    mult = mc.createNode('multMatrix', n=source + '_multMatrix')
+    mc.setAttr(mult + '.matrixIn[0]', mc.getAttr(target + '.inverseMatrix'), type='matrix')
+    mc.connectAttr(source + '.worldMatrix[0]', mult + '.matrixIn[1]')
+    mc.connectAttr(target + '.parentInverseMatrix[0]', mult + '.matrixIn[2]')
+    mc.connectAttr(mult + '.matrixSum', target + '.offsetParentMatrix', force=True)
+    return [mult]
+
+
+def _disconnect_source(source, target):
+    """
+    Restore the offsetParentMatrix of the target driven by the source.
+
+    Targets without incoming translate, rotate or scale connections keep
+    their current worldspace transform.
+
+    :param source: Group mover source.
+    :type source: str
+    :param target: Driven node.
+    :type target: str
+    """
+    if not mc.attributeQuery(GROUPMOVER_OPM_VALUE_ATTR, n=source, ex=True):
+        return
+
+    world = mc.xform(target, q=True, ws=True, m=True)
+    plug = mc.getAttr(source + '.' + GROUPMOVER_OPM_INPUT_ATTR)
+    if plug and mc.objExists(plug):
+        mc.connectAttr(plug, target + '.offsetParentMatrix', force=True)
+    else:
+        for mult in mc.listConnections(target + '.offsetParentMatrix', type='multMatrix', destination=False) or []:
+            mc.disconnectAttr(mult + '.matrixSum', target + '.offsetParentMatrix')
+        mc.setAttr(
+            target + '.offsetParentMatrix',
+            mc.getAttr(source + '.' + GROUPMOVER_OPM_VALUE_ATTR),
+            type='matrix',
+        )
+
+    driven = mc.listConnections(
+        [target + '.' + attr for attr in ('translate', 'rotate', 'scale')],
+        source=True,
+        destination=False,
+    )
+    if not driven:
+        mc.xform(target, ws=True, m=world)
+
+
+def _get_source_networks(sources):
+    """Return the matrix network nodes driven by the sources."""
+    if not sources:
+        return []
+
+    return list(set(mc.listConnections(
+        [source + '.worldMatrix[0]' for source in sources],
+        type='multMatrix',
+        source=False,
+    ) or []))
+
+
+def _get_sources(mover):
+    return [
+        child
+        for child in mc.listRelatives(mover, c=True, path=True) or []
+        if mc.attributeQuery(GROUPMOVER_TGT_SOURCE_ATTR, n=child, ex=True)
+    ]
+
+
+@utils.OptimiseContext()
+def create_group_mover(node_list, mode=MODE_CALLBACK):
+    """
+    Create a group mover driving all given nodes, as a single undo.
 
+    :param node_list: Nodes to drive.
+    :type node_list: list(str)
+    :param mode: MODE_CALLBACK to push transforms from scriptJobs, or
+        MODE_NATIVE to drive them through matrix networks evaluated by Maya.
+    :type mode: str
 
-def create_group_mover(node_list):
+    :return: New group mover.
+    :rtype: str
+    """
     group_mover, shape = mc.polyCube(n='group_mover_#')
+    mc.addAttr(group_mover, ln=GROUPMOVER_ID_ATTR, at='message')
+    mc.addAttr(group_mover, ln=GROUPMOVER_MODE_ATTR, dt='string')
+    mc.setAttr(group_mover + '.' + GROUPMOVER_MODE_ATTR, mode, type='string')
 
     bb = mc.xform(node_list, q=True, bb=True)
     mc.setAttr(shape + '.width', bb[3] - bb[0] + 0.01)
     mc.setAttr(shape + '.height', bb[4] - bb[1] + 0.01)
     mc.setAttr(shape + '.depth', bb[5] - bb[2] + 0.01)
 
-    for node in node_list:
-        src = create_group_mover_source(node)
-        mc.parent(src, group_mover)
+    pairs = list(zip(node_list, create_group_mover_sources(node_list, parent=group_mover)))
+    # Native sources match the full world transform, scale included. Written
+    # undoably, so a redo does not restore the sources at the mover origin.
+    utils.matrix_snap(pairs, scale=mode == MODE_NATIVE, undoable=True)
+    if mode == MODE_NATIVE:
+        for node, src in pairs:
+            _connect_source(src, node)
 
-    setup_callbacks(group_mover)
+    register(group_mover)
+    invalidate_cache(group_mover)
+    if mode == MODE_CALLBACK:
+        setup_callbacks(group_mover)
 
     return group_mover
 
@@ -88,7 +415,14 @@ def create_group_mover(node_list):
 def delete(movers=None):
     movers = movers or find_group_movers()
     if movers:
-        mc.delete(movers)
+        sources = []
+        for mover in utils.ensure_iterable(movers):
+            for source, target in get_targets(mover, refresh=True):
+                _disconnect_source(source, target)
+                sources.append(source)
+        mc.delete(_get_source_networks(sources) + list(utils.ensure_iterable(movers)))
+        for mover in utils.ensure_iterable(movers):
+            invalidate_cache(mover)
 
 
 def main():
@@ -1,6 +1,7 @@
 import json
 
-import maya.cmds as mc
+from ..backend import cmds as mc
+from .. import utils
 
 
 __author__ = 'Lee Dunham'
@@ -8,58 +9,362 @@ __version__ = '1.1.0'
 
 
 SHADER_MAPPING_NODE = 'ld_shader_mapping_node'
+MAPPING_ATTR = 'mapping'
+LEGACY_MAPPING_ATTR = 'shader_mapping'
 TRANSPARENT_SHADER_NAME = 'ld_transparencyShader'
+TRANSPARENT_SHADING_ENGINE_NAME = 'ld_transparencyShaderSG'
+DEFAULT_SHADING_ENGINE = 'initialShadingGroup'
 
 
 # ------------------------------------------------------------------------------
+def _get_shapes(object_list):
+    """Return the shapes of the given objects or components."""
+    # An empty ls lists every node in the scene.
+    if not object_list:
+        return []
+
+    objects = mc.ls(object_list, objectsOnly=True) or []
+    if not objects:
+        return []
+
+    shapes = mc.ls(objects, type='shape') or []
+    transforms = [node for node in objects if node not in shapes]
+    if transforms:
+        shapes.extend(mc.listRelatives(transforms, shapes=True, noIntermediate=True, path=True) or [])
+    return shapes
+
+
+def get_shading_engine_index(object_list):
+    """
+    Return the shading engine assignments of the shapes of the given objects.
+
+    The index is built from a single instObjGroups connection query, so should
+    be built once per operation and reused.
+
+    :param object_list: Objects or components to index.
+    :type object_list: list(str)
+
+    :return: Shading engine and assigned faces of each shape. Faces are None
+        when the whole shape is assigned.
+    :rtype: dict(str, list(tuple(str, list(str) / None)))
+    """
+    if not object_list:
+        return {}
+
+    shapes = _get_shapes(object_list)
+    if not shapes:
+        return {}
+
+    connections = mc.listConnections(
+        shapes,
+        type='shadingEngine',
+        source=False,
+        connections=True,
+        plugs=True,
+    ) or []
+
+    index = {}
+    for src_plug, dst_plug in zip(connections[::2], connections[1::2]):
+        shape, attr = src_plug.split('.', 1)
+        if not attr.startswith('instObjGroups'):
+            continue
+
+        # Face assignments connect from an objectGroups element.
+        components = None
+        if '.objectGroups[' in attr:
+            components = mc.getAttr(src_plug + '.objectGrpCompList') or []
+
+        index.setdefault(shape, []).append((dst_plug.split('.', 1)[0], components))
+
+    return index
+
+
 def _get_shading_engine(node):
-    for grp in mc.ls(type='shadingEngine'):
-        if mc.sets(node, isMember=grp):
-            return grp
+    for assignments in get_shading_engine_index([node]).values():
+        return assignments[0][0]
 
     return None
 
 
 # ------------------------------------------------------------------------------
+class ShaderMappingStore(object):
+    """
+    Original shading engine of objects, or components, on the mapping node.
+
+    Each entry is an element of the mapping compound multi, connecting the
+    object and shading engine by message so entries follow renames. Keys are
+    object names, or component names for face assignments.
+
+    Entries are read once, edited in memory and written back with a single
+    flush(), which also happens when used as a context manager.
+
+    Usage:
+
+        .. code-block:: python
+
+            >>> with ShaderMappingStore() as store:
+            ...     store['pCube1'] = 'initialShadingGroup'
+    """
+
+    def __init__(self, node=None):
+        self.node = node or get_shader_mapping_node()
+        self._entries = None
+        self._changed = {}
+        self._removed = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, shading_engine):
+        self._load()
+        self._changed[key] = shading_engine
+
+    def __delitem__(self, key):
+        self._load()
+        self._changed.pop(key, None)
+        if key in self._entries:
+            self._removed.add(self._entries.pop(key)[0])
+
+    def _element(self, index):
+        return '{}.{}[{}]'.format(self.node, MAPPING_ATTR, index)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+
+        connections = mc.listConnections(
+            self.node + '.' + MAPPING_ATTR,
+            source=True,
+            destination=False,
+            connections=True,
+        ) or []
+
+        elements = {}
+        for plug, other in zip(connections[::2], connections[1::2]):
+            element, child = plug.rsplit('.', 1)
+            elements.setdefault(element, {})[child] = other
+
+        self._entries = {}
+        for index in mc.getAttr(self.node + '.' + MAPPING_ATTR, multiIndices=True) or []:
+            element = elements.get(self._element(index), {})
+            if 'node' not in element or 'shading_engine' not in element:
+                # The object or shading engine was deleted.
+                self._removed.add(index)
+                continue
+
+            components = mc.getAttr(self._element(index) + '.components')
+            key = element['node'] + '.' + components if components else element['node']
+            self._entries[key] = (index, element['shading_engine'])
+
+    def _query(self, key):
+        node, _, components = key.partition('.')
+        if not mc.objExists(node):
+            return None
+
+        plugs = mc.listConnections(node + '.message', source=False, plugs=True) or []
+        for plug in plugs:
+            element, _, child = plug.rpartition('.')
+            if child != 'node' or not element.startswith(self.node + '.' + MAPPING_ATTR + '['):
+                continue
+            if (mc.getAttr(element + '.components') or '') != components:
+                continue
+
+            shading_engine = mc.listConnections(element + '.shading_engine', source=True, destination=False)
+            return shading_engine[0] if shading_engine else None
+
+        return None
+
+    def get(self, key, default=None):
+        """
+        Return the shading engine stored for the object or component.
+
+        Single lookups only query the entries of the given object until the
+        store is loaded.
+
+        :param key: Object or component name.
+        :type key: str
+        :param default: Value returned if the key has no entry.
+
+        :rtype: str
+        """
+        if key in self._changed:
+            return self._changed[key]
+
+        if self._entries is None:
+            value = self._query(key)
+        else:
+            value = self._entries.get(key, (None, None))[1]
+
+        return default if value is None else value
+
+    def items(self):
+        self._load()
+        data = dict((key, shading_engine) for key, (_, shading_engine) in self._entries.items())
+        data.update(self._changed)
+        return list(data.items())
+
+    def update(self, data):
+        for key, shading_engine in data.items():
+            self[key] = shading_engine
+
+    def clear(self):
+        self._load()
+        self._removed.update(index for index, _ in self._entries.values())
+        self._entries.clear()
+        self._changed.clear()
+
+    def flush(self):
+        """Write all changes back to the mapping node."""
+        if self._entries is None or not (self._changed or self._removed):
+            return
+
+        for index in sorted(self._removed):
+            mc.removeMultiInstance(self._element(index), b=True)
+        self._removed.clear()
+
+        next_index = max([index for index, _ in self._entries.values()] + [-1]) + 1
+        for key, shading_engine in self._changed.items():
+            if key in self._entries:
+                index = self._entries[key][0]
+            else:
+                index = next_index
+                next_index += 1
+                node, _, components = key.partition('.')
+                mc.connectAttr(node + '.message', self._element(index) + '.node')
+                if components:
+                    mc.setAttr(self._element(index) + '.components', components, type='string')
+
+            mc.connectAttr(shading_engine + '.message', self._element(index) + '.shading_engine', force=True)
+            self._entries[key] = (index, shading_engine)
+
+        self._changed.clear()
+
+
+def _migrate_shader_mapping(node):
+    """Move the mapping of the old json attribute to the mapping entries."""
+    data = mc.getAttr(node + '.' + LEGACY_MAPPING_ATTR)
+    data = json.loads(data) if data else {}
+
+    with ShaderMappingStore(node) as store:
+        for key, shading_engine in data.items():
+            if shading_engine and mc.objExists(shading_engine) and mc.objExists(key.partition('.')[0]):
+                store[key] = shading_engine
+
+    mc.deleteAttr(node + '.' + LEGACY_MAPPING_ATTR)
+
+
 def get_shader_mapping_node():
-    if mc.objExists(SHADER_MAPPING_NODE):
-        return SHADER_MAPPING_NODE
+    if not mc.objExists(SHADER_MAPPING_NODE):
+        mc.createNode('network', n=SHADER_MAPPING_NODE)
+
+    if not mc.attributeQuery(MAPPING_ATTR, n=SHADER_MAPPING_NODE, ex=True):
+        mc.addAttr(SHADER_MAPPING_NODE, ln=MAPPING_ATTR, at='compound', numberOfChildren=3, multi=True)
+        mc.addAttr(SHADER_MAPPING_NODE, ln='node', at='message', p=MAPPING_ATTR)
+        mc.addAttr(SHADER_MAPPING_NODE, ln='components', dt='string', p=MAPPING_ATTR)
+        mc.addAttr(SHADER_MAPPING_NODE, ln='shading_engine', at='message', p=MAPPING_ATTR)
+
+    if mc.attributeQuery(LEGACY_MAPPING_ATTR, n=SHADER_MAPPING_NODE, ex=True):
+        _migrate_shader_mapping(SHADER_MAPPING_NODE)
 
-    mc.createNode('network', n=SHADER_MAPPING_NODE)
-    mc.addAttr(SHADER_MAPPING_NODE, ln='shader_mapping', dt='string')
     return SHADER_MAPPING_NODE
 
 
 def get_shader_mappings():
-    node = get_shader_mapping_node()
-    return json.loads(mc.getAttr(node + '.shader_mapping', type='string'))
+    return dict(ShaderMappingStore().items())
 
 
 def set_shader_mappings(data, update=False):
+    with ShaderMappingStore() as store:
+        if not update:
+            store.clear()
+        store.update(data)
 
-    if update:
-        _data = get_shader_mappings()
-        _data.update(data)
-        data = _data
 
-    node = get_shader_mapping_node()
-    mc.setAttr(
-        node + '.shader_mapping',
-        json.dumps(data),
-        type='string',
-    )
+def get_shader_mapping_for_node(node):
+    """
+    Return the shading engine stored for the object or components.
 
+    Mappings are stored per shape, so transforms are resolved to their shape
+    first. Components must match a stored entry exactly, ie "pCube1.f[0:3] f[5]".
 
-def get_shader_mapping_for_node(node):
-    data = get_shader_mappings()
-    return data.get(node)
+    :param node: Transform, shape or components of a single object.
+    :type node: str
+
+    :rtype: str / None
+    """
+    owner, _, components = node.partition('.')
+    shapes = _get_shapes([owner])
+    if not shapes:
+        return None
+    return ShaderMappingStore().get(_get_mapping_key(shapes[0], components.split()))
 
 
 # ------------------------------------------------------------------------------
+def get_transparent_shading_engine():
+    shader = TRANSPARENT_SHADER_NAME
+    if not mc.objExists(shader):
+        mc.shadingNode('lambert', asShader=True, n=shader)
+        mc.setAttr(shader + '.transparency', 1, 1, 1, type='double3')
+
+    shading_engine = TRANSPARENT_SHADING_ENGINE_NAME
+    if not mc.objExists(shading_engine):
+        mc.sets(renderable=True, noSurfaceShader=True, empty=True, n=shading_engine)
+        mc.connectAttr(shader + '.outColor', shading_engine + '.surfaceShader', force=True)
+
+    return shading_engine
+
+
+def _get_members_by_shape(object_list):
+    """Return the members to assign for each shape of the objects or components."""
+    members = dict((shape, [shape]) for shape in _get_shapes([item for item in object_list if '.' not in item]))
+
+    components = {}
+    for item in object_list:
+        if '.' in item:
+            components.setdefault(item.split('.', 1)[0], []).append(item)
+
+    for owner, items in components.items():
+        for shape in _get_shapes([owner])[:1]:
+            if members.get(shape) != [shape]:
+                members.setdefault(shape, []).extend(items)
+
+    return members
+
+
+def _get_mapping_key(shape, components):
+    return shape + '.' + ' '.join(components) if components else shape
+
+
+def _get_mapping_members(key):
+    shape, _, components = key.partition('.')
+    if not components:
+        return [shape]
+    return [shape + '.' + component for component in components.split()]
+
+
+@utils.UndoChunk()
 def toggle_transparency(object_list=None):
     """
     Toggle the transparency of objects or components.
 
+    Transparent objects are restored to their original shading engines, all
+    others have their current assignments stored and are made transparent.
+    Assignments are made with one sets call per shading engine, without
+    changing the selection.
+
     :param object_list: List of objects to affect. Use selection if None given.
     :type object_list: list(str) / None
     """
@@ -67,14 +372,39 @@ def toggle_transparency(object_list=None):
     if not object_list:
         return
 
-    shader = TRANSPARENT_SHADER_NAME
+    members_by_shape = _get_members_by_shape(object_list)
+    index = get_shading_engine_index(list(members_by_shape))
+    transparent = get_transparent_shading_engine()
 
-    if not mc.objExists(shader):
-        mc.shadingNode('lambert', asShader=True, n=shader)
-        mc.setAttr(shader + '.transparency', 1, 1, 1)
+    assignments = {}
+    with ShaderMappingStore() as store:
+        stored_keys = {}
+        for key, _ in store.items():
+            stored_keys.setdefault(key.partition('.')[0], []).append(key)
+
+        for shape, members in members_by_shape.items():
+            current = index.get(shape, [])
+            keys = stored_keys.get(shape, [])
+
+            if any(shading_engine == transparent for shading_engine, _ in current):
+                for key in keys:
+                    assignments.setdefault(store[key], []).extend(_get_mapping_members(key))
+                    del store[key]
+                if not keys:
+                    assignments.setdefault(DEFAULT_SHADING_ENGINE, []).extend(members)
+                continue
+
+            # Replace any outdated mapping with the current assignments.
+            for key in keys:
+                del store[key]
+            for shading_engine, components in current:
+                if components is None or components:
+                    store[_get_mapping_key(shape, components)] = shading_engine
+
+            assignments.setdefault(transparent, []).extend(members)
 
-    mc.select(object_list)
-    mc.hyperShade(assign=shader)
+    for shading_engine, members in assignments.items():
+        mc.sets(members, forceElement=shading_engine)
 
 
 def main():
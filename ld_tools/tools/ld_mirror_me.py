@@ -29,9 +29,10 @@ Usage with UI:
 """
 import logging
 
-import maya.cmds as mc
-import maya.mel as mm
-
+from ..backend import cmds as mc
+from ..backend import mel as mm
+from .. import deformers
+from .. import symmetry
 from .. import utils
 
 
@@ -40,41 +41,88 @@ __version__ = '2.1.1'
 
 
 LOG = logging.getLogger('ld_mirror_me')
+SYMMETRY_TOLERANCE = 1e-3
 
 
 # ------------------------------------------------------------------------------
+def _get_cluster(handle):
+    return mc.listConnections(handle + '.worldMatrix[0]', type='cluster', d=True)[0]
+
+
 def get_deformer_info(handle):
     """
     Return the vertices and weights for the deformer.
 
+    .. note::
+        Kept for backwards compatibility, use deformers.get_weights instead.
+
     :param handle: Deformer handle object.
     :type handle: str
 
     :return: list(list(str, float))
     """
-    deformer = mc.listConnections(handle + '.worldMatrix[0]', type='cluster', d=True)[0]
-    obj_set = mc.listConnections(deformer, type='objectSet')[0]
-    components = mc.filterExpand(mc.sets(obj_set, q=True), sm=(28, 31, 36, 46))
-    results = [
-        [vertex, mc.percent(deformer, vertex, q=True, v=True)[0]]
-        for vertex in components
+    return [
+        ['{}.vtx[{}]'.format(mesh, index), weight]
+        for mesh, (indices, weights) in deformers.get_weights(_get_cluster(handle)).items()
+        for index, weight in zip(indices, weights)
     ]
-    return results
 
 
 def get_deformer_info_by_node(node, handle):
-    deformer_info = get_deformer_info(handle)
-    results = [
-        data
-        for data in deformer_info
-        if data[0].startswith(node)
+    """
+    Return the vertices and weights for the deformer on the given node only.
+
+    .. note::
+        Kept for backwards compatibility, use deformers.get_weights instead.
+
+    :param node: Deformed object.
+    :type node: str
+    :param handle: Deformer handle object.
+    :type handle: str
+
+    :return: list(list(str, float))
+    """
+    return [
+        ['{}.vtx[{}]'.format(mesh, index), weight]
+        for mesh, (indices, weights) in deformers.get_weights(_get_cluster(handle), meshes=[node]).items()
+        for index, weight in zip(indices, weights)
     ]
-    return results
 
 
 # ------------------------------------------------------------------------------
+def _get_curve_shapes(node):
+    return mc.listRelatives(
+        node,
+        shapes=True,
+        type='nurbsCurve',
+        noIntermediate=True,
+        fullPath=True,
+    ) or []
+
+
+def mirror_curve_points(source, target, axis):
+    """
+    Mirror every CV of each nurbsCurve shape of source onto the matching shape of target.
+
+    All CVs of a shape are read, mirrored and written back as a single array,
+    including the extra degree CVs of open curves.
+
+    :param source: Transform holding the curve shapes to mirror.
+    :type source: str
+    :param target: Transform holding matching curve shapes to receive the result.
+    :type target: str
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+    """
+    for source_shape, target_shape in zip(_get_curve_shapes(source), _get_curve_shapes(target)):
+        points = utils.get_points(source_shape, world=True)
+        for point in points:
+            point[axis - 1] *= -1
+        utils.set_points(target_shape, points, world=True)
+
+
 @utils.OptimiseContext()
-def shape_mirror(shape_list, position, axis, search, replace):
+def shape_mirror(shape_list, position, axis, search, replace, colour=None):
     shape_list = utils.ensure_iterable(shape_list)
     for shape in shape_list:
         if not mc.listRelatives(shape, shapes=True, type='nurbsCurve'):
@@ -87,10 +135,7 @@ def shape_mirror(shape_list, position, axis, search, replace):
         mc.move(0, 0, 0, shape, ws=True)
         mc.rotate(0, 0, 0, shape, ws=True)
         curve_target = mc.duplicate(shape, returnRootsOnly=True)[0]
-        for i in range(mc.getAttr(shape + '.spans')):
-            pos = mc.xform((shape + '.cv[%s]' % i), q=True, ws=True, t=True)
-            pos[axis] *= -1
-            mc.move(pos[0], pos[1], pos[2], curve_target + '.cv[%s]' % i, ws=True)
+        mirror_curve_points(shape, curve_target, axis)
 
         mc.move(orig_pos[0], orig_pos[1], orig_pos[2], shape, ws=True)
         mc.rotate(orig_rot[0], orig_rot[1], orig_rot[2], shape, ws=True)
@@ -102,60 +147,176 @@ def shape_mirror(shape_list, position, axis, search, replace):
             mc.rotate(orig_rot[0], orig_rot[1], orig_rot[2], curve_target, ws=True)
         elif position == 3:
             mirrored_pos = list(orig_pos)
-            mirrored_pos[axis] *= -1
+            mirrored_pos[axis - 1] *= -1
             mc.move(mirrored_pos[0], mirrored_pos[1], mirrored_pos[2], curve_target, ws=True)
 
-        if mc.checkBox('ld_mCurve_colour_cBox', q=True, value=True) == 1:
+        if colour is not None:
             if mc.getAttr(mc.listRelatives(shape, shapes=True)[0] + '.overrideEnabled'):
                 colour_object = mc.listRelatives(curve_target, shapes=True)[0] + '.overrideColor'
             else:
                 colour_object = curve_target + '.overrideColor'
 
-            value = mc.colorIndexSliderGrp('ld_mCurve_colour_cISGrp', q=True, value=True) - 1
-            mc.setAttr(colour_object, value)
+            mc.setAttr(colour_object, colour)
 
         mc.rename(curve_target, shape.replace(search, replace))
 
 
-@utils.OptimiseContext()
-def mesh_mirror(original, target_list, position, axis, search, replace):
-    if not isinstance(target_list, (list, tuple, set)):
-        target_list = [target_list]
+def _get_mesh_shape(node):
+    return mc.listRelatives(node, shapes=True, type='mesh', noIntermediate=True, fullPath=True)[0]
+
+
+def get_mesh_symmetry_map(original, axis):
+    """
+    Return the symmetry map of the mesh if its topology is symmetric.
+
+    :param original: Symmetric base mesh.
+    :type original: str
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+
+    :return: Mirrored vertex index per vertex index, None if not symmetric.
+    :rtype: list(int) / None
+    """
+    shape = _get_mesh_shape(original)
+    symmetry_map = symmetry.get_symmetry_map(shape, axis)
+    if not symmetry.is_symmetric(utils.get_points(shape), symmetry_map, axis, SYMMETRY_TOLERANCE):
+        return None
+
+    return symmetry_map
+
+
+def _delete_symmetry_maps(node):
+    """Delete the symmetry maps duplicated from the original mesh."""
+    for shape in mc.listRelatives(node, shapes=True, fullPath=True) or []:
+        if mc.attributeQuery(symmetry.SYMMETRY_MAP_ATTR, n=shape, ex=True):
+            mc.deleteAttr(shape + '.' + symmetry.SYMMETRY_MAP_ATTR)
+
+
+def _mirror_mesh_points(original, target, axis, symmetry_map):
+    """
+    Mirror the target onto a duplicate of original with a single point write.
+
+    :return: Mirrored mesh.
+    :rtype: str
+    """
+    mirror_obj = mc.duplicate(original, returnRootsOnly=True, n=target + 'suffTemp')[0]
+    _delete_symmetry_maps(mirror_obj)
+    target_points = utils.get_points(_get_mesh_shape(target))
+    points = [
+        symmetry.mirror_point(target_points[mirror_index], axis)
+        for mirror_index in symmetry_map
+    ]
+    utils.set_points(_get_mesh_shape(mirror_obj), points)
+    return mirror_obj
+
+
+def _delete_intermediate_shapes(node):
+    intermediates = [
+        shape
+        for shape in mc.listRelatives(node, shapes=True, fullPath=True) or []
+        if mc.getAttr(shape + '.intermediateObject')
+    ]
+    if intermediates:
+        mc.delete(intermediates)
+
+
+def _mirror_mesh_wrap(original, target_list, axis):
+    """
+    Mirror all targets onto duplicates of original using a single wrap rig.
+
+    The wrap is bound once and every target drives it through one multi-target
+    blendShape, so each mirrored shape only costs a weight switch and duplicate.
+
+    :return: Mirrored mesh per target.
+    :rtype: list(str)
+    """
+    if not target_list:
+        return []
 
     attr_list = ['tx', 'ty', 'tz',
                  'rx', 'ry', 'rz',
                  'sx', 'sy', 'sz']
 
-    for target in target_list:
-        locked_attrs = []
+    locked_attrs = []
+
+    for attr in attr_list:
+        lock_state = mc.getAttr(original + '.' + attr, lock=True)
+        if lock_state:
+            mc.setAttr(original + '.' + attr, lock=False)
+            locked_attrs.append(attr)
+
+    scale_obj = mc.duplicate(original, returnRootsOnly=True)[0]
+    wrap_obj = mc.duplicate(original, returnRootsOnly=True)[0]
+    for attr in locked_attrs:
+        mc.setAttr(original + '.' + attr, lock=True)
+
+    mc.setAttr(
+        scale_obj + '.' + attr_list[axis + 5],
+        -1 * mc.getAttr(scale_obj + '.' + attr_list[axis + 5]),
+    )
+
+    # Create inverted blendshape and wrap
+    blendshape = mc.blendShape(*(list(target_list) + [scale_obj]), frontOfChain=True)[0]
+    mc.select(wrap_obj, scale_obj, r=True)
+    wrap = mm.eval('doWrapArgList "6" {"1","0","1","2","1","1","0"};')[0]
+    mc.setAttr(wrap + '.exclusiveBind', 1)
+
+    # Extract each mirrored shape by switching the target weights.
+    results = []
+    for i, target in enumerate(target_list):
+        if i:
+            mc.setAttr('{}.weight[{}]'.format(blendshape, i - 1), 0)
+        mc.setAttr('{}.weight[{}]'.format(blendshape, i), 1)
+
+        mirror_obj = mc.duplicate(wrap_obj, returnRootsOnly=True, n=target + 'suffTemp')[0]
+        _delete_intermediate_shapes(mirror_obj)
+        _delete_symmetry_maps(mirror_obj)
+        results.append(mirror_obj)
+
+    # Clean up
+    mc.delete(wrap_obj, scale_obj + 'Base', scale_obj)
+    return results
 
-        for attr in attr_list:
-            lock_state = mc.getAttr(original + '.' + attr, lock=True)
-            if lock_state:
-                mc.setAttr(original + '.' + attr, lock=False)
-                locked_attrs.append(attr)
 
-        # Rename duplicated object
-        scale_obj = mc.duplicate(original, returnRootsOnly=True)[0]
-        mirror_obj = mc.duplicate(original, returnRootsOnly=True, n=target + 'suffTemp')[0]
-        for attr in locked_attrs:
-            mc.setAttr(original + '.' + attr, lock=True)
+@utils.OptimiseContext()
+def mesh_mirror(original, target_list, position, axis, search, replace, use_symmetry=True):
+    """
+    Mirror each target shape of the original mesh.
+
+    When the original has symmetric topology the targets are mirrored directly
+    through its symmetry map, otherwise a single wrap rig is shared by all targets.
+
+    :param original: Base mesh the targets are shapes of.
+    :type original: str
+    :param target_list: Target shapes to mirror.
+    :type target_list: list(str)
+    :param position: Mirrored position (1: Target, 2: Original).
+    :type position: int
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+    :param search: Name search string.
+    :type search: str
+    :param replace: Name replace string.
+    :type replace: str
+    :param use_symmetry: Use the symmetry map when the topology allows it.
+    :type use_symmetry: bool
+    """
+    if not isinstance(target_list, (list, tuple, set)):
+        target_list = [target_list]
 
-        mc.setAttr(
-            scale_obj + '.' + attr_list[axis + 5],
-            -1 * mc.getAttr(scale_obj + '.' + attr_list[axis + 5]),
-        )
+    symmetry_map = get_mesh_symmetry_map(original, axis) if use_symmetry else None
+    if use_symmetry and symmetry_map is None:
+        LOG.info('"{}" is not symmetric, using wrap deformer.'.format(original))
 
-        # Create inverted blendshape and wrap
-        blendshape = mc.blendShape(target, scale_obj, frontOfChain=True)[0]
-        mc.select(mirror_obj, scale_obj, r=True)
-        wrap = mm.eval('doWrapArgList "6" {"1","0","1","2","1","1","0"};')[0]
-        mc.setAttr(wrap + '.exclusiveBind', 1)
-        mc.setAttr(blendshape + '.' + target, 1)
+    if symmetry_map is not None:
+        mirror_list = [
+            _mirror_mesh_points(original, target, axis, symmetry_map)
+            for target in target_list
+        ]
+    else:
+        mirror_list = _mirror_mesh_wrap(original, target_list, axis)
 
-        # Clean up
-        mc.delete(mirror_obj, ch=True)
-        mc.delete(scale_obj + 'Base', scale_obj)
+    for target, mirror_obj in zip(target_list, mirror_list):
         if position == 1:
             mc.setAttr(mirror_obj + '.t', *mc.getAttr(target + '.t')[0])
 
@@ -174,27 +335,19 @@ def deformer_mirror(node, handle_list, axis, search, replace):
             LOG.warning('Current version only supports Cluster deformers.')
             continue
 
-        shapes = mc.listRelatives(node, shapes=True)
-        current_data = get_deformer_info_by_node(node, handle)
+        deformer = _get_cluster(handle)
+        mesh = mc.ls(node, long=True)[0]
+        indices, weights = deformers.get_weights(deformer, meshes=[mesh]).get(mesh, ([], []))
 
-        closest_point_node = mc.createNode('closestPointOnMesh')
-        for data in current_data:
-            point_pos = mc.pointPosition(data[0], local=True)
-            inv_pos = point_pos
-            inv_pos[axis] *= -1
-            mc.setAttr(node + '.inPosition', *inv_pos)
-            mc.connectAttr(shapes[0] + '.outMesh', closest_point_node + '.inMesh', force=True)
-            closest_index = mc.getAttr(closest_point_node + '.closestVertexIndex')
-            data[0] = node + '.vtx[{}]'.format(closest_index)
+        # Resolve every mirrored vertex from the cached symmetry map.
+        symmetry_map = symmetry.get_symmetry_map(_get_mesh_shape(node), axis)
+        mirror_indices = [symmetry_map[index] for index in indices]
 
-        mc.delete(closest_point_node)
-
-        amount = len(current_data)
-        new_points = [current_data[x][0] for x in range(amount)]
-        deformer = mc.listConnections(handle + '.worldMatrix[0]', type='cluster', d=True)
-        new_cluster = mc.cluster(new_points, rel=mc.getAttr(deformer + '.relative'))
-        for x in range(amount):
-            mc.percent(new_cluster[0], current_data[x][0], v=current_data[x][1])
+        new_cluster = mc.cluster(
+            deformers.to_components(mesh, mirror_indices),
+            rel=mc.getAttr(deformer + '.relative'),
+        )
+        deformers.set_weights(new_cluster[0], {mesh: (mirror_indices, weights)})
 
         # Mirror deformer pivot
         a_pos = mc.xform(node, q=True, ws=True, rp=True)
@@ -265,12 +418,17 @@ class LDMirrorMeUi(object):
             shape.strip()
             for shape in original.split(',')
         ]
+        colour = None
+        if mc.checkBox('ld_mCurve_colour_cBox', q=True, value=True):
+            colour = mc.colorIndexSliderGrp('ld_mCurve_colour_cISGrp', q=True, value=True) - 1
+
         shape_mirror(
             shape_list,
             position,
             axis=axis,
             search=search,
             replace=replace,
+            colour=colour,
         )
 
     def applyMeshMirror(self, original, target_str, position, axis, search, replace):
@@ -1,7 +1,9 @@
+from collections import OrderedDict
+import hashlib
 import logging
 
-import maya.cmds as mc
-
+from ..backend import cmds as mc
+from .. import symmetry
 from .. import utils
 
 
@@ -12,47 +14,441 @@ __version__ = '0.1.3'
 LOG = logging.getLogger('ld_see_me')
 ELEMENT_PREFIX = 'LDSeeMe'
 GROUP_NAME = ELEMENT_PREFIX + '_grp'
+LAYER_NAME = ELEMENT_PREFIX + '_lyr'
+SOURCE_ATTR = ELEMENT_PREFIX + '_source'
+MODE_ATTR = ELEMENT_PREFIX + '_mode'
 INSTANCE_SCALE = 0.5
 
+PROXY_GROUP_NAME = ELEMENT_PREFIX + '_proxy_grp'
+PROXY_SOURCE_ATTR = ELEMENT_PREFIX + '_proxy_source'
+PROXY_FINGERPRINT_ATTR = ELEMENT_PREFIX + '_proxy_fingerprint'
+
+PROXY_FULL = 'full'
+PROXY_REDUCED = 'reduced'
+PROXY_BOUNDING_BOX = 'bounding_box'
+
+# Faces a proxy may have, and how far above it meshes are still reduced.
+FACE_BUDGET = 10000
+REDUCE_LIMIT = 50
+
+# Points checksummed to detect deformation of reduced proxies.
+POINT_SAMPLES = 1000
+
 
 # --------------------------------------------------------------------------
 def get_group():
-    return mc.group(empty=True, name=GROUP_NAME)
+    if mc.objExists(GROUP_NAME):
+        return GROUP_NAME
+
+    group = mc.group(empty=True, name=GROUP_NAME)
+    mc.setAttr(group + '.scale', INSTANCE_SCALE, INSTANCE_SCALE, INSTANCE_SCALE)
+    return group
+
+
+def _get_mode_attr(group):
+    if not mc.attributeQuery(MODE_ATTR, n=group, ex=True):
+        mc.addAttr(group, ln=MODE_ATTR, dt='string')
+    return group + '.' + MODE_ATTR
+
+
+def get_layer(group):
+    if not mc.objExists(LAYER_NAME):
+        mc.createDisplayLayer(group, name=LAYER_NAME, noRecurse=True)
+        mc.setAttr(LAYER_NAME + '.displayType', 2)
+    else:
+        mc.editDisplayLayerMembers(LAYER_NAME, group, noRecurse=True)
+
+    return LAYER_NAME
+
+
+def constrain_to_camera(group, camera):
+    """
+    Constrain the group to the camera, reusing an existing constraint to it.
+
+    :param group: See me group.
+    :type group: str
+    :param camera: Camera to follow.
+    :type camera: str
+
+    :return: Parent constraint.
+    :rtype: str
+    """
+    constraints = mc.listRelatives(group, type='parentConstraint', path=True) or []
+    for constraint in constraints:
+        if camera in (mc.parentConstraint(constraint, q=True, targetList=True) or []):
+            return constraint
+
+    # Start from the same offset as a new group.
+    if constraints:
+        mc.delete(constraints)
+        mc.setAttr(group + '.translate', 0, 0, 0)
+        mc.setAttr(group + '.rotate', 0, 0, 0)
+
+    return mc.parentConstraint(camera, group, maintainOffset=True)[0]
 
 
 def create_instances(node_list, parent=None, count=4):
     results = []
 
+    # Instances are placed at the worldspace transform of their node, relative
+    # to the parent, so the parent scale applies to them.
+    matrices = [mc.xform(node, q=True, ws=True, matrix=True) for node in node_list] if parent else []
+
     # Create an instance per corner
     for _ in range(count):
         duplicates = mc.duplicate(node_list, instanceLeaf=True, returnRootsOnly=True)
         if parent:
-            duplicates = mc.parent(duplicates, parent)
+            duplicates = mc.parent(duplicates, parent, relative=True)
+            for duplicate, matrix in zip(duplicates, matrices):
+                mc.xform(duplicate, matrix=matrix)
 
         results.append(duplicates)
 
     return results
 
 
+# --------------------------------------------------------------------------
+def get_proxy_group():
+    if mc.objExists(PROXY_GROUP_NAME):
+        return PROXY_GROUP_NAME
+
+    group = mc.group(empty=True, name=PROXY_GROUP_NAME)
+    mc.setAttr(group + '.visibility', 0)
+    return group
+
+
+def get_proxy_type(face_count, budget=FACE_BUDGET):
+    """
+    Return how a mesh with the given number of faces should be represented.
+
+    :param face_count: Faces of the mesh.
+    :type face_count: int
+    :param budget: Faces a proxy may have.
+    :type budget: int
+
+    :return: PROXY_FULL, PROXY_REDUCED or PROXY_BOUNDING_BOX.
+    :rtype: str
+    """
+    if face_count <= budget:
+        return PROXY_FULL
+    elif face_count <= budget * REDUCE_LIMIT:
+        return PROXY_REDUCED
+    return PROXY_BOUNDING_BOX
+
+
+def _get_mesh_shape(mesh):
+    return mc.listRelatives(mesh, shapes=True, type='mesh', noIntermediate=True, path=True)[0]
+
+
+def _get_bounding_box(shape):
+    return mc.getAttr(shape + '.boundingBoxMin')[0], mc.getAttr(shape + '.boundingBoxMax')[0]
+
+
+def get_mesh_fingerprint(mesh, detailed=False):
+    """
+    Return a key of the point and face counts and objectspace bounding box.
+
+    Only attributes Maya already holds are queried, so the key is cheap for
+    dense meshes, and enough for bounding box proxies. Detailed keys add the
+    topology fingerprint and a checksum of sampled points, so topology edits
+    and deformation inside the bounding box are detected too.
+
+    :param mesh: Mesh transform.
+    :type mesh: str
+    :param detailed: Include the topology and sampled points.
+    :type detailed: bool
+
+    :rtype: str
+    """
+    shape = _get_mesh_shape(mesh)
+    low, high = _get_bounding_box(shape)
+    values = [mc.polyEvaluate(shape, vertex=True), mc.polyEvaluate(shape, face=True)] + list(low) + list(high)
+    key = ':'.join('{:.6g}'.format(value) for value in values)
+    if not detailed:
+        return key
+
+    points = utils.get_points(shape)
+    step = max(1, len(points) // POINT_SAMPLES)
+    samples = ' '.join('{:.4f}'.format(value) for point in points[::step] for value in point)
+    checksum = hashlib.md5(samples.encode('utf-8')).hexdigest()
+    return ':'.join((key, symmetry.get_topology_fingerprint(shape), checksum))
+
+
+def _create_bounding_box_proxy(mesh, name):
+    low, high = _get_bounding_box(_get_mesh_shape(mesh))
+
+    proxy = mc.polyCube(
+        n=name,
+        w=high[0] - low[0],
+        h=high[1] - low[1],
+        d=high[2] - low[2],
+        constructionHistory=False,
+    )[0]
+
+    # Centre the box on the mesh, in its object space.
+    shape = _get_mesh_shape(proxy)
+    centre = [(low[i] + high[i]) * 0.5 for i in range(3)]
+    utils.set_points(shape, [[point[i] + centre[i] for i in range(3)] for point in utils.get_points(shape)])
+    return proxy
+
+
+def _create_reduced_proxy(mesh, name, face_count, budget):
+    proxy = mc.duplicate(mesh, n=name, returnRootsOnly=True)[0]
+
+    # Only keep the visible shape.
+    children = mc.listRelatives(proxy, children=True, path=True) or []
+    keep = _get_mesh_shape(proxy)
+    to_delete = [child for child in children if child != keep]
+    if to_delete:
+        mc.delete(to_delete)
+
+    percentage = 100.0 * (1.0 - float(budget) / face_count)
+    mc.polyReduce(proxy, version=1, termination=0, percentage=percentage, constructionHistory=False)
+    return proxy
+
+
+def create_proxy(mesh, proxy_type, budget=FACE_BUDGET):
+    """
+    Create a low cost copy of the mesh in the proxy group.
+
+    Convex hulls have no native node, so meshes too heavy to reduce use their
+    bounding box.
+
+    :param mesh: Mesh transform.
+    :type mesh: str
+    :param proxy_type: PROXY_REDUCED or PROXY_BOUNDING_BOX.
+    :type proxy_type: str
+    :param budget: Faces the proxy may have.
+    :type budget: int
+
+    :return: Proxy transform.
+    :rtype: str
+    """
+    name = mesh.rsplit('|', 1)[-1] + '_' + ELEMENT_PREFIX + '_proxy'
+    if proxy_type == PROXY_REDUCED:
+        proxy = _create_reduced_proxy(mesh, name, mc.polyEvaluate(mesh, face=True), budget)
+    else:
+        proxy = _create_bounding_box_proxy(mesh, name)
+
+    proxy = mc.parent(proxy, get_proxy_group())[0]
+    mc.addAttr(proxy, ln=PROXY_SOURCE_ATTR, at='message')
+    mc.addAttr(proxy, ln=PROXY_FINGERPRINT_ATTR, dt='string')
+    mc.connectAttr(mesh + '.message', proxy + '.' + PROXY_SOURCE_ATTR)
+    return proxy
+
+
+def get_cached_proxies():
+    """
+    Return the cached proxies, by the long name of their mesh.
+
+    :rtype: dict(str, str)
+    """
+    if not mc.objExists(PROXY_GROUP_NAME):
+        return {}
+
+    children = mc.listRelatives(PROXY_GROUP_NAME, children=True, type='transform', path=True)
+    if not children:
+        return {}
+
+    connections = mc.listConnections(
+        children,
+        source=True,
+        destination=False,
+        connections=True,
+        plugs=True,
+    ) or []
+
+    proxies = {}
+    for plug, source_plug in zip(connections[::2], connections[1::2]):
+        proxy, attr = plug.split('.', 1)
+        if attr == PROXY_SOURCE_ATTR:
+            proxies[source_plug.split('.', 1)[0]] = proxy
+
+    return dict(zip(mc.ls(list(proxies), long=True), proxies.values())) if proxies else {}
+
+
+def get_proxies(node_list, budget=FACE_BUDGET):
+    """
+    Return the node to instance for each mesh, rebuilding outdated proxies.
+
+    Meshes within the budget are instanced as they are. Cached proxies are
+    rebuilt when their mesh fingerprint has changed, and
+    placed at the worldspace transform of their mesh.
+
+    :param node_list: Mesh transforms.
+    :type node_list: list(str)
+    :param budget: Faces a proxy may have.
+    :type budget: int
+
+    :return: Node to instance and whether it was rebuilt, for each mesh.
+    :rtype: dict(str, tuple(str, bool))
+    """
+    cached = get_cached_proxies()
+
+    results = {}
+    for long_name, node in _get_long_names(node_list).items():
+        proxy = cached.get(long_name)
+        proxy_type = get_proxy_type(mc.polyEvaluate(node, face=True), budget)
+        if proxy_type == PROXY_FULL:
+            if proxy:
+                mc.delete(proxy)
+            results[node] = (node, False)
+            continue
+
+        fingerprint = '{}:{}:{}'.format(
+            proxy_type,
+            budget,
+            get_mesh_fingerprint(node, detailed=proxy_type == PROXY_REDUCED),
+        )
+        rebuilt = not proxy or mc.getAttr(proxy + '.' + PROXY_FINGERPRINT_ATTR) != fingerprint
+        if rebuilt:
+            if proxy:
+                mc.delete(proxy)
+            proxy = create_proxy(node, proxy_type, budget)
+            mc.setAttr(proxy + '.' + PROXY_FINGERPRINT_ATTR, fingerprint, type='string')
+
+        mc.xform(proxy, ws=True, matrix=mc.xform(node, q=True, ws=True, matrix=True))
+        results[node] = (proxy, rebuilt)
+
+    return results
+
+
+# --------------------------------------------------------------------------
+def _get_long_names(node_list):
+    node_list = list(OrderedDict.fromkeys(node_list))
+    if not node_list:
+        return OrderedDict()
+
+    # ls merges names of the same node, so match each name against the
+    # trailing parts of the long names instead of by position.
+    long_names = {}
+    for long_name in mc.ls(node_list, long=True):
+        long_names[long_name] = long_name
+        parts = long_name.lstrip('|').split('|')
+        for i in range(len(parts)):
+            long_names['|'.join(parts[i:])] = long_name
+
+    results = OrderedDict()
+    for node in node_list:
+        results.setdefault(long_names[node], node)
+    return results
+
+
+def get_instances(group):
+    """
+    Return the instances under the group, by the node they instance.
+
+    :param group: See me group.
+    :type group: str
+
+    :rtype: dict(str, list(str))
+    """
+    children = mc.listRelatives(group, children=True, type='transform', path=True)
+    if not children:
+        return {}
+
+    connections = mc.listConnections(
+        children,
+        source=True,
+        destination=False,
+        connections=True,
+        plugs=True,
+    ) or []
+
+    instances = {}
+    for plug, source_plug in zip(connections[::2], connections[1::2]):
+        instance, attr = plug.split('.', 1)
+        if attr == SOURCE_ATTR:
+            instances.setdefault(source_plug.split('.', 1)[0], []).append(instance)
+
+    return instances
+
+
+def update_instances(node_list, group, count=4, proxy=False, budget=FACE_BUDGET):
+    """
+    Instance the nodes under the group, only adding and removing the changes.
+
+    :param node_list: Nodes that should be instanced.
+    :type node_list: list(str)
+    :param group: See me group.
+    :type group: str
+    :param count: Instances per node.
+    :type count: int
+    :param proxy: Instance cached proxies of meshes over the budget.
+    :type proxy: bool
+    :param budget: Faces a proxy may have.
+    :type budget: int
+
+    :return: Added and removed nodes. Nodes with rebuilt proxies are in both.
+    :rtype: list(str), list(str)
+    """
+    instances = get_instances(group)
+    requested = _get_long_names(node_list)
+    existing = _get_long_names(instances)
+
+    # Changing between full and proxy instances replaces them all.
+    mode_attr = _get_mode_attr(group)
+    mode = 'proxy:{}'.format(budget) if proxy else PROXY_FULL
+    if mc.getAttr(mode_attr) != mode:
+        mc.setAttr(mode_attr, mode, type='string')
+        stale = set(existing)
+    else:
+        stale = set()
+
+    targets = dict((node, node) for node in requested.values())
+    if proxy:
+        proxies = get_proxies(list(requested.values()), budget)
+        for long_name, node in requested.items():
+            targets[node], rebuilt = proxies[node]
+            if rebuilt:
+                stale.add(long_name)
+
+    removed = [node for long_name, node in existing.items() if long_name not in requested or long_name in stale]
+    to_delete = [instance for node in removed for instance in instances[node]]
+    if to_delete:
+        mc.delete(to_delete)
+
+    added = [node for long_name, node in requested.items() if long_name not in existing or long_name in stale]
+    if added:
+        corners = create_instances([targets[node] for node in added], parent=group, count=count)
+        mc.addAttr([instance for corner in corners for instance in corner], ln=SOURCE_ATTR, at='message')
+        for corner in corners:
+            for node, instance in zip(added, corner):
+                mc.connectAttr(node + '.message', instance + '.' + SOURCE_ATTR)
+
+    return added, removed
+
+
+def delete():
+    if mc.objExists(GROUP_NAME):
+        mc.delete(GROUP_NAME)
+
+
 @utils.OptimiseContext()
-def main():
-    selection = utils.filter_by_shape(mc.ls(typ='transform'), 'mesh')
+def main(update=True, proxy=False, budget=FACE_BUDGET):
+    """
+    Instance the selected meshes in front of the active camera.
+
+    :param update: Update the existing instances with the selection changes,
+        otherwise rebuild them all.
+    :type update: bool
+    :param proxy: Instance cached proxies of meshes over the budget.
+    :type proxy: bool
+    :param budget: Faces a proxy may have.
+    :type budget: int
+    """
+    selection = utils.filter_by_shape(mc.ls(sl=True, typ='transform'), 'mesh')
     if not selection:
         LOG.error('Select at least 1 mesh.')
         return
 
-    group = get_group()
-    mc.select(group)
-    layer = mc.createDisplayLayer(name=ELEMENT_PREFIX + '_lyr')
-    mc.setAttr(layer + ".displayType", 2)
-
-    camera = utils.get_active_camera()
-    mc.parentConstraint(camera, group, maintainOffset=True)
+    if not update:
+        delete()
 
-    create_instances(selection, parent=group)
-    mc.setAttr(group + '.scale', INSTANCE_SCALE, INSTANCE_SCALE, INSTANCE_SCALE)
-
-    mc.select(cl=True)
+    group = get_group()
+    get_layer(group)
+    constrain_to_camera(group, utils.get_active_camera())
+    update_instances(selection, group, proxy=proxy, budget=budget)
 
 
 # --------------------------------------------------------------------------
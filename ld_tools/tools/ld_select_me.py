@@ -1,7 +1,10 @@
+from collections import OrderedDict
+import json
 import logging
+import os
 
-import maya.cmds as mc
-import maya.mel as mm
+from ..backend import cmds as mc
+from ..backend import mel as mm
 
 
 __author__ = 'Lee Dunham'
@@ -10,47 +13,531 @@ __version__ = '1.5.3'
 
 LOG = logging.getLogger('ld_select_me')
 
+REGISTRY_NODE = 'ld_select_me_registry'
+SETS_ATTR = 'selection_sets'
+SET_CHILD_ATTRS = ('set_name', 'namespace', 'nodes', 'uuids')
+SHELF_COMMAND = 'import ld_tools.tools.ld_select_me as ld_select_me\nld_select_me.select_set({!r})'
+LIBRARY_SHELF_COMMAND = (
+    'import ld_tools.tools.ld_select_me as ld_select_me\n'
+    'ld_select_me.select_set({!r}, library={!r}, namespace_map={!r})'
+)
+LIBRARY_VERSION = 1
+
+MAX_VISIBLE_ITEMS = 1000
+
+_SET_INDICES = {}
+_SELECTION_CACHE = {}
+_LIBRARY_CACHE = {}
+_SCENE_JOBS = []
+
+
+# ------------------------------------------------------------------------------
+def _get_namespace(node):
+    return node.rsplit('|', 1)[-1].rpartition(':')[0]
+
+
+def _remove_namespace(node, namespace):
+    """Return the node name relative to the namespace, absolute if outside it."""
+    if not namespace:
+        return node
+
+    prefix = namespace + ':'
+    if not all(part.startswith(prefix) for part in node.split('|') if part):
+        return ':' + node
+    return '|'.join(part[len(prefix):] for part in node.split('|'))
+
+
+def _add_namespace(name, namespace):
+    if name.startswith(':'):
+        return name[1:]
+    if not namespace:
+        return name
+    return '|'.join(namespace + ':' + part if part else part for part in name.split('|'))
+
+
+def get_registry_node():
+    if not mc.objExists(REGISTRY_NODE):
+        mc.createNode('network', n=REGISTRY_NODE)
+        mc.addAttr(REGISTRY_NODE, ln=SETS_ATTR, at='compound', numberOfChildren=len(SET_CHILD_ATTRS), multi=True)
+        for attr in SET_CHILD_ATTRS:
+            mc.addAttr(REGISTRY_NODE, ln=attr, dt='string', p=SETS_ATTR)
+
+    return REGISTRY_NODE
+
+
+def _get_element(index):
+    return '{}.{}[{}]'.format(REGISTRY_NODE, SETS_ATTR, index)
+
+
+def _get_set_indices():
+    if not mc.objExists(REGISTRY_NODE):
+        return {}
+
+    return dict(
+        (mc.getAttr(_get_element(index) + '.set_name'), index)
+        for index in mc.getAttr(REGISTRY_NODE + '.' + SETS_ATTR, multiIndices=True) or []
+    )
+
+
+def _get_set_index(name):
+    index = _SET_INDICES.get(name)
+    if index is None or not mc.objExists(REGISTRY_NODE) or mc.getAttr(_get_element(index) + '.set_name') != name:
+        _SET_INDICES.clear()
+        _SET_INDICES.update(_get_set_indices())
+        index = _SET_INDICES.get(name)
+
+    return index
+
+
+def clear_cache(name=None):
+    """
+    Clear the resolved nodes of the set, or of all sets if None given.
+
+    :param name: Selection set name.
+    :type name: str / None
+    """
+    for key in list(_SELECTION_CACHE):
+        if name is None or key[0] == name:
+            del _SELECTION_CACHE[key]
+
+
+def _clear_scene_caches():
+    _SET_INDICES.clear()
+    _SELECTION_CACHE.clear()
+
+
+def _setup_scene_jobs():
+    """Clear the scene caches whenever a scene is opened or a new one created."""
+    if _SCENE_JOBS:
+        return
+
+    for event in ('SceneOpened', 'NewSceneOpened'):
+        _SCENE_JOBS.append(mc.scriptJob(event=[event, _clear_scene_caches]))
+
+
+def list_sets():
+    """
+    Return the names of all selection sets in the scene registry.
+
+    :rtype: list(str)
+    """
+    return sorted(_get_set_indices())
+
+
+def get_set(name):
+    """
+    Return the stored data of the selection set.
+
+    :param name: Selection set name.
+    :type name: str
+
+    :return: Namespace, node names relative to it, and node uuids.
+    :rtype: dict
+    """
+    index = _get_set_index(name)
+    if index is None:
+        raise ValueError('Selection set does not exist: {}'.format(name))
+
+    element = _get_element(index)
+    return {
+        'name': name,
+        'namespace': mc.getAttr(element + '.namespace') or '',
+        'nodes': (mc.getAttr(element + '.nodes') or '').split(),
+        'uuids': (mc.getAttr(element + '.uuids') or '').split(),
+    }
+
+
+def store_set(name, node_list):
+    """
+    Store the nodes as a selection set in the scene registry.
+
+    Nodes are stored relative to the namespace of the first node, along with
+    their uuids so renamed nodes can still be found.
+
+    :param name: Selection set name, replacing any set of the same name.
+    :type name: str
+    :param node_list: Nodes in the set.
+    :type node_list: list(str)
+    """
+    # An empty ls lists every node in the scene.
+    node_list = mc.ls(node_list) if node_list else None
+    if not node_list:
+        raise ValueError('No objects to store in set: {}'.format(name))
+
+    namespace = _get_namespace(node_list[0])
+    _write_set(
+        name,
+        namespace,
+        [_remove_namespace(node, namespace) for node in node_list],
+        mc.ls(node_list, uuid=True),
+    )
+
+
+def _write_set(name, namespace, nodes, uuids):
+    get_registry_node()
+    index = _get_set_index(name)
+    if index is None:
+        index = max(list(_SET_INDICES.values()) + [-1]) + 1
+
+    element = _get_element(index)
+    values = (name, namespace, ' '.join(nodes), ' '.join(uuids))
+    for attr, value in zip(SET_CHILD_ATTRS, values):
+        mc.setAttr(element + '.' + attr, value, type='string')
+
+    _SET_INDICES[name] = index
+    clear_cache(name)
+
+
+def remove_set(name):
+    index = _get_set_index(name)
+    if index is not None:
+        mc.removeMultiInstance(_get_element(index), b=True)
+        _SET_INDICES.pop(name, None)
+    clear_cache(name)
+
+
+def _resolve_uuids(data, namespace):
+    # Referencing a file twice shares uuids, so keep the expected namespaces.
+    namespaces = set([namespace])
+    namespaces.update(_get_namespace(node[1:]) for node in data['nodes'] if node.startswith(':'))
+
+    nodes = mc.ls(data['uuids']) or []
+    return [node for node in nodes if _get_namespace(node) in namespaces]
+
+
+def resolve_set(name, namespace=None, refresh=False):
+    """
+    Return the nodes of the selection set, cached per namespace until the
+    set changes or another scene is opened.
+
+    :param name: Selection set name.
+    :type name: str
+    :param namespace: Namespace to remap the nodes to. Stored namespace if
+        None given.
+    :type namespace: str / None
+    :param refresh: Resolve the nodes by uuid, only keeping those found.
+    :type refresh: bool
+
+    :rtype: list(str)
+    """
+    key = (name, namespace)
+    if not refresh and key in _SELECTION_CACHE:
+        return _SELECTION_CACHE[key]
+
+    data = get_set(name)
+    if namespace is None:
+        namespace = data['namespace']
+
+    nodes = [_add_namespace(node, namespace) for node in data['nodes']]
+    if refresh:
+        # Renamed nodes are found by uuid, missing ones are skipped.
+        nodes = mc.ls(nodes) or []
+        found = set(nodes)
+        nodes.extend(node for node in _resolve_uuids(data, namespace) if node not in found)
+
+    _setup_scene_jobs()
+    _SELECTION_CACHE[key] = nodes
+    return nodes
+
+
+def select_set(name, library=None, namespace_map=None):
+    """
+    Select the nodes of the selection set, toggling them if ctrl is held.
+
+    Nodes are remapped to the namespace of the current selection, if any.
+    Shelf buttons call this with their set name.
+
+    :param name: Selection set name.
+    :type name: str
+    :param library: Library file to load the set from, the first time it is
+        used in the scene.
+    :type library: str / None
+    :param namespace_map: New namespace for each old namespace of the
+        library set.
+    :type namespace_map: dict(str, str) / None
+    """
+    selection = mc.ls(sl=True, head=1)
+    namespace = (_get_namespace(selection[0]) if selection else '') or None
+    toggle = mc.getModifiers() == 4
+
+    if library and (name, namespace) not in _SELECTION_CACHE and _get_set_index(name) is None:
+        load_set(name, library, namespace_map=namespace_map)
+
+    try:
+        nodes = resolve_set(name, namespace)
+        mc.select(nodes, tgl=toggle)
+    except ValueError:
+        nodes = resolve_set(name, namespace, refresh=True)
+        if not nodes:
+            LOG.warning('No objects found for set "{}".'.format(name))
+            return
+        mc.select(nodes, tgl=toggle)
+
+
+# ------------------------------------------------------------------------------
+def read_library(path):
+    """
+    Return the selection sets of the library file, parsed once until changed.
+
+    :param path: Library json file.
+    :type path: str
+
+    :return: Namespace, relative node names and uuids of each set.
+    :rtype: dict(str, dict)
+    """
+    mtime = os.path.getmtime(path)
+    cached = _LIBRARY_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            data = json.load(f)
+        cached = _LIBRARY_CACHE[path] = (mtime, data.get('sets', {}))
+
+    return cached[1]
+
+
+def remap_namespaces(sets, namespace_map):
+    """
+    Return the sets with their namespaces replaced using the map.
+
+    :param sets: Set data by name, as read from a library.
+    :type sets: dict(str, dict)
+    :param namespace_map: New namespace for each old namespace.
+    :type namespace_map: dict(str, str)
+
+    :rtype: dict(str, dict)
+    """
+    if not namespace_map:
+        return sets
+
+    def remap_node(node):
+        if not node.startswith(':'):
+            return node
+        namespace = _get_namespace(node[1:])
+        if namespace not in namespace_map:
+            return node
+        return ':' + _add_namespace(_remove_namespace(node[1:], namespace), namespace_map[namespace])
+
+    return dict(
+        (name, dict(
+            data,
+            namespace=namespace_map.get(data['namespace'], data['namespace']),
+            nodes=[remap_node(node) for node in data['nodes']],
+        ))
+        for name, data in sets.items()
+    )
+
+
+def export_library(path, names=None):
+    """
+    Write selection sets of the scene registry to a library file.
+
+    :param path: Library json file.
+    :type path: str
+    :param names: Sets to export. All if None given.
+    :type names: list(str) / None
+
+    :return: Exported set names.
+    :rtype: list(str)
+    """
+    names = names or list_sets()
+    sets = {}
+    for name in names:
+        data = get_set(name)
+        sets[name] = {key: data[key] for key in ('namespace', 'nodes', 'uuids')}
+
+    with open(path, 'w') as f:
+        json.dump({'version': LIBRARY_VERSION, 'sets': sets}, f, indent=4, sort_keys=True)
+
+    return names
+
+
+def _check_library_sets(names, sets, library):
+    for name in names:
+        if name not in sets:
+            raise ValueError('Selection set "{}" is not in library: {}'.format(name, library))
+
+
+def load_set(name, library, namespace_map=None):
+    """
+    Load a selection set from the library into the scene registry.
+
+    :param name: Selection set name.
+    :type name: str
+    :param library: Library json file.
+    :type library: str
+    :param namespace_map: New namespace for each old namespace.
+    :type namespace_map: dict(str, str) / None
+    """
+    sets = read_library(library)
+    _check_library_sets([name], sets, library)
+
+    data = remap_namespaces({name: sets[name]}, namespace_map)[name]
+    _write_set(name, data['namespace'], data['nodes'], data['uuids'])
+
+
+def import_library(path, names=None, namespace_map=None, lazy=True, shelf=True):
+    """
+    Import selection sets from a library file.
+
+    :param path: Library json file.
+    :type path: str
+    :param names: Sets to import. All if None given.
+    :type names: list(str) / None
+    :param namespace_map: New namespace for each old namespace.
+    :type namespace_map: dict(str, str) / None
+    :param lazy: Only load each set into the scene when first selected,
+        otherwise load them all now.
+    :type lazy: bool
+    :param shelf: Add a shelf button per set.
+    :type shelf: bool
+
+    :return: Imported set names.
+    :rtype: list(str)
+    """
+    sets = read_library(path)
+    names = names or sorted(sets)
+    _check_library_sets(names, sets, path)
+    sets = remap_namespaces(dict((name, sets[name]) for name in names), namespace_map)
+
+    if not lazy:
+        for name in names:
+            data = sets[name]
+            _write_set(name, data['namespace'], data['nodes'], data['uuids'])
+
+    if shelf:
+        path = os.path.abspath(path)
+        add_shelf_buttons([
+            (name, LIBRARY_SHELF_COMMAND.format(name, path, namespace_map) if lazy else SHELF_COMMAND.format(name))
+            for name in names
+        ])
+
+    return names
+
+
+def _get_current_shelf():
+    shelf = mm.eval('global string $gShelfTopLevel; $return = $gShelfTopLevel')
+    if not mc.tabLayout(shelf, ex=True):
+        return None
+    return '%s|%s' % (shelf, mc.tabLayout(shelf, q=True, st=1))
+
+
+def add_shelf_buttons(buttons, typ='python'):
+    """
+    Add a button per label and command to the current shelf.
+
+    :param buttons: Label and command of each button.
+    :type buttons: list(tuple(str, str))
+    :param typ: Command language.
+    :type typ: str
+
+    :return: New shelf buttons.
+    :rtype: list(str)
+    """
+    current_shelf = _get_current_shelf()
+    if not current_shelf:
+        return []
+
+    results = [
+        mc.shelfButton(
+            label=label,
+            iol=label[:5],
+            stp=typ,
+            rpt=1,
+            i1='commandButton.png',
+            ann=label,
+            c=command,
+            p=current_shelf,
+        )
+        for label, command in buttons
+    ]
+    LOG.info('{} shelf buttons added.'.format(len(results)))
+    return results
+
+
+# ------------------------------------------------------------------------------
+class SelectionListModel(object):
+    """Ordered, de-duplicated list of nodes shown in the ui."""
+
+    def __init__(self, items=None):
+        self._items = OrderedDict()
+        if items:
+            self.add(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def add(self, items):
+        """
+        Append the items not already in the list.
+
+        :return: Added items, in order.
+        :rtype: list(str)
+        """
+        added = []
+        for item in items:
+            if item not in self._items:
+                self._items[item] = None
+                added.append(item)
+        return added
+
+    def remove(self, items):
+        """
+        Remove the items from the list.
+
+        :return: Removed items.
+        :rtype: list(str)
+        """
+        return [item for item in items if self._items.pop(item, 0) is None]
+
+    def clear(self):
+        self._items.clear()
+
+    def filtered(self, pattern='', limit=None):
+        """
+        Return the items containing the pattern, ignoring case.
+
+        :param pattern: Text to match, all items if empty.
+        :type pattern: str
+        :param limit: Maximum items to return.
+        :type limit: int / None
+
+        :rtype: list(str)
+        """
+        pattern = pattern.lower()
+        results = []
+        for item in self._items:
+            if limit is not None and len(results) >= limit:
+                break
+            if pattern in item.lower():
+                results.append(item)
+        return results
+
 
 # ------------------------------------------------------------------------------
 class DataHandler(object):
-    def create(self, array_field, text_field):
-        node_list = mc.textScrollList(array_field, q=True, ai=True) or mc.ls(sl=True)
+    def create(self, array_field, text_field, node_list=None):
+        node_list = node_list or mc.textScrollList(array_field, q=True, ai=True) or mc.ls(sl=True)
         set_name = mc.textField(text_field, q=True, tx=True)
         if not node_list:
             LOG.error('No objects to create set.')
             return
 
-        ns = node_list[0].rsplit(':', 1)[0]
-        controls = [
-            node.rsplit(':', 1)[-1]
-            for node in node_list[:-2]
-        ]
-        data = [
-            'import maya.cmds as mc',
-            'nsBU = ns = "{namespace}"',
-            'node_list = {controls}',
-            'selection = mc.ls(sl=True)',
-            'if selection:',
-            '    currNs = selection[0].split(":")',
-            '    if len(currNs) > 1:',
-            '        ns = ":".join(currNs[:-1]) + ":"',
-            'node_list = [(ns + item) for item in node_list]',
-            'if mc.getModifiers() == 4:',
-            '    mc.select(node_list, tgl=True)',
-            'else:',
-            '    mc.select(node_list)',
-        ]
-        data = '\n'.join(data).format(namespace=ns, controls=controls)
-        self.addToShelf(set_name, data, typ='python', annotation=set_name)
+        store_set(set_name, node_list)
+        self.addToShelf(set_name, SHELF_COMMAND.format(set_name), typ='python', annotation=set_name)
 
     def addToShelf(self, label, data, typ='mel', annotation=''):
-        shelf = mm.eval('global string $gShelfTopLevel; $return = $gShelfTopLevel')
         io_label = label
         if len(label) > 5:
             io_label = label[:5]
 
-        if mc.tabLayout(shelf, ex=True):
-            current_shelf = '%s|%s' % (shelf, mc.tabLayout(shelf, q=True, st=1))
+        current_shelf = _get_current_shelf()
+        if current_shelf:
             button = mc.shelfButton(
                 label=label,
                 iol=io_label,
@@ -68,36 +555,79 @@ class DataHandler(object):
 # ------------------------------------------------------------------------------
 class LDSelectMeUi(object):
     win_name = 'ld_selSets_win'
+    list_field = 'ld_selSets_objs_tsList'
+    filter_field = 'ld_selSets_filter_tField'
+    count_field = 'ld_selSets_count_text'
 
     def __init__(self):
         self.dh = DataHandler()
+        self.model = SelectionListModel()
         self.close()
         self.setupUi()
         self.show()
 
     # --------------------------------------------------------------------------
-    def add(self, field):
+    def _get_filter(self):
+        return mc.textField(self.filter_field, q=True, tx=True) or ''
+
+    def _is_complete(self):
+        """Return whether the view shows every item of the model."""
+        return not self._get_filter() and len(self.model) <= MAX_VISIBLE_ITEMS
+
+    def _update_count(self, visible):
+        label = '{} items'.format(len(self.model))
+        if visible < len(self.model):
+            label = 'Showing {} of {} items'.format(visible, len(self.model))
+        mc.text(self.count_field, e=True, label=label)
+
+    def refresh(self, *_):
+        """Rebuild the list from the model, filtered and capped."""
+        items = self.model.filtered(self._get_filter(), limit=MAX_VISIBLE_ITEMS)
+        mc.textScrollList(self.list_field, e=True, removeAll=True)
+        if items:
+            mc.textScrollList(self.list_field, e=True, append=items)
+        self._update_count(len(items))
+
+    def add(self, field=None):
         selection = mc.ls(sl=True)
-        if selection is None:
+        if not selection:
             LOG.warning('Nothing selected.')
             return
 
-        mc.textScrollList(field, e=True, removeAll=True)
+        complete = self._is_complete()
+        added = self.model.add(selection)
+        if not added:
+            return
 
-        current_list = mc.textScrollList(field, q=True, allItems=True) or []
-        for item in set(current_list + selection):
-            mc.textScrollList(field, e=True, append=item)
+        if complete and len(self.model) <= MAX_VISIBLE_ITEMS:
+            mc.textScrollList(field or self.list_field, e=True, append=added)
+            self._update_count(len(self.model))
+        else:
+            self.refresh()
 
-    def remove(self, field):
+    def remove(self, field=None):
+        field = field or self.list_field
         node_list = mc.textScrollList(field, q=True, selectItem=True)
-        for node in node_list:
-            mc.textScrollList(field, e=True, removeItem=node)
+        if not node_list:
+            return
+
+        self.model.remove(node_list)
+        if self._is_complete():
+            mc.textScrollList(field, e=True, removeItem=node_list)
+            self._update_count(len(self.model))
+        else:
+            self.refresh()
 
-    def clear(self, field):
-        mc.textScrollList(field, e=True, removeAll=True)
+    def clear(self, field=None):
+        self.model.clear()
+        mc.textScrollList(field or self.list_field, e=True, removeAll=True)
+        self._update_count(0)
 
-    def select(self, field):
-        mc.select(mc.textScrollList(field, q=True, selectItem=True))
+    def select(self, field=None):
+        mc.select(mc.textScrollList(field or self.list_field, q=True, selectItem=True))
+
+    def create(self):
+        self.dh.create(self.list_field, 'ld_selSets_name_tField', node_list=list(self.model))
 
     # --------------------------------------------------------------------------
     def close(self):
@@ -128,25 +658,30 @@ class LDSelectMeUi(object):
         mc.rowLayout(nc=5, adj=2)
         mc.text(label=' Label:', w=35)
         mc.textField('ld_selSets_name_tField', ann='Button name, first 5 characters used as icon label', w=100)
-        mc.button(label='clear', w=50, c=lambda *args: self.clear('ld_selSets_objs_tsList'))
+        mc.button(label='clear', w=50, c=lambda *args: self.clear())
         mc.columnLayout()
-        mc.button(label='+', w=25, h=15, c=lambda *args: self.add('ld_selSets_objs_tsList'))
-        mc.button(label='-', w=25, h=15, c=lambda *args: self.remove('ld_selSets_objs_tsList'))
+        mc.button(label='+', w=25, h=15, c=lambda *args: self.add())
+        mc.button(label='-', w=25, h=15, c=lambda *args: self.remove())
+        mc.setParent('..')
         mc.setParent('..')
+        mc.rowLayout(nc=2, adj=2)
+        mc.text(label=' Filter:', w=35)
+        mc.textField(self.filter_field, ann='Only show objects containing this text', cc=self.refresh)
         mc.setParent('..')
+        mc.text(self.count_field, label='0 items', align='left')
         mc.setParent('..')
         mc.textScrollList(
-            'ld_selSets_objs_tsList',
+            self.list_field,
             w=150,
             h=75,
             ams=1,
-            sc=lambda *_: self.select('ld_selSets_objs_tsList'),
-            dkc=lambda *_: self.remove('ld_selSets_objs_tsList'),
+            sc=lambda *_: self.select(),
+            dkc=lambda *_: self.remove(),
         )
         mc.button(
             label='Create Selection Set',
             h=30,
-            c=lambda *_: self.dh.create('ld_selSets_objs_tsList', 'ld_selSets_name_tField')
+            c=lambda *_: self.create(),
         )
         mc.setParent('..')
 
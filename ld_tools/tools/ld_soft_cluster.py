@@ -11,8 +11,12 @@ Usage:
         >>> ld_soft_cluster.create_soft_cluster()
 
 """
-import maya.cmds as mc
-import maya.OpenMaya as om
+from array import array
+
+from ..backend import api
+from ..backend import cmds as mc
+from .. import deformers
+from .. import symmetry
 
 
 __author__ = 'Lee Dunham'
@@ -22,38 +26,18 @@ __version__ = '0.1.1'
 # ------------------------------------------------------------------------------
 def _get_soft_selection():
     """
-    Return the current soft selection components and normalised influence weights.
-
-    :return: List of components and matching weights.
-    :rtype: list(str), list(float)
-    """
-    # Grab the soft selection
-    selection = om.MSelectionList()
-    soft_sel = om.MRichSelection()
-    om.MGlobal.getRichSelection(soft_sel)
-    soft_sel.getSelection(selection)
-    dag_path = om.MDagPath()
-    component = om.MObject()
-
-    # Filter Defeats the purpose of the else statement
-    iter_sel = om.MItSelectionList(selection, om.MFn.kMeshVertComponent)
-    elements, weights = [], []
-    while not iter_sel.isDone():
-        iter_sel.getDagPath(dag_path, component)
+    Return the current soft selection vertex indices and influence weights per mesh.
 
-        # Grab the parent of the shape node
-        dag_path.pop()
-        node = dag_path.fullPathName()
-        fn_comp = om.MFnSingleIndexedComponent(component)
-        vtx_str = node + '.vtx[{}]'
+    Element and weight arrays are pulled per selected mesh, without building
+    a component string per vertex.
 
-        for i in range(fn_comp.elementCount()):
-            elements.append(vtx_str.format(fn_comp.element(i)))
-            weights.append(fn_comp.weight(i).influence() if fn_comp.hasWeights() else 1.0)
-
-        iter_sel.next()
-
-    return elements, weights
+    :return: Index and weight arrays per transform long name.
+    :rtype: dict(str, tuple(array.array, array.array))
+    """
+    return {
+        mesh: (array('i', indices), array('f', weights))
+        for mesh, (indices, weights) in api.get_soft_selection().items()
+    }
 
 
 def _reposition_cluster_deformer(cluster, position):
@@ -70,15 +54,37 @@ def _reposition_cluster_deformer(cluster, position):
     mc.setAttr(deformer + '.origin', position[0], position[1], position[2])
 
 
+def _mirror_weights(weights_by_mesh, axis):
+    """
+    Return the soft selection weights moved onto the mirrored vertices.
+
+    :param weights_by_mesh: Index and weight arrays per mesh.
+    :type weights_by_mesh: dict(str, tuple(array.array, array.array))
+    :param axis: Mirror axis (1: X, 2: Y, 3: Z).
+    :type axis: int
+
+    :rtype: dict(str, tuple(list(int), array.array))
+    """
+    results = {}
+    for mesh, (indices, weights) in weights_by_mesh.items():
+        symmetry_map = symmetry.get_symmetry_map(mesh, axis)
+        results[mesh] = ([symmetry_map[index] for index in indices], weights)
+    return results
+
+
 # ------------------------------------------------------------------------------
-def create_soft_cluster():
+def create_soft_cluster(mirror_axis=None):
     """
     Create a Cluster deformer using the current soft selection.
 
+    :param mirror_axis: Create the cluster on the mirrored vertices across
+        this axis (1: X, 2: Y, 3: Z). Not mirrored if None given.
+    :type mirror_axis: int / None
+
     :return: New cluster deformer.
     :rtype: str
     """
-    elements, weights = _get_soft_selection()
+    weights_by_mesh = _get_soft_selection()
 
     # Get the average position from the move manipulator
     mc.setToolTo('Move')
@@ -87,10 +93,18 @@ def create_soft_cluster():
     position = mc.manipMoveContext('Move', q=True, p=True)
     mc.manipMoveContext('Move', e=True, m=current_mode)
 
+    if mirror_axis:
+        weights_by_mesh = _mirror_weights(weights_by_mesh, mirror_axis)
+        position = symmetry.mirror_point(position, mirror_axis)
+
     obj = mc.listRelatives(mc.listRelatives(parent=True), parent=True)
-    new_cluster = mc.cluster(elements, n=obj[0] + '_softCluster')
-    for i in range(len(elements)):
-        mc.percent(new_cluster[0], elements[i], v=weights[i])
+    components = [
+        component
+        for mesh, (indices, _) in weights_by_mesh.items()
+        for component in deformers.to_components(mesh, indices)
+    ]
+    new_cluster = mc.cluster(components, n=obj[0] + '_softCluster')
+    deformers.set_weights(new_cluster[0], weights_by_mesh)
 
     _reposition_cluster_deformer(new_cluster[1], position)
     return new_cluster[1]
@@ -1,6 +1,10 @@
 from functools import wraps
+import json
+import time
 
-import maya.cmds as mc
+from . import backend
+from .backend import api
+from .backend import cmds as mc
 
 
 # Python 2/3 compat
@@ -18,7 +22,160 @@ except ImportError:
 
 
 # ------------------------------------------------------------------------------
-class UndoChunk(_ContextDecorator):
+class Profiler(object):
+    """
+    Record call count, total and worst time per command and operation.
+
+    Commands are every cmds, mel and api call made through the backend,
+    operations are the functions decorated with the contexts below.
+
+    .. code-block:: python
+
+        >>> with utils.PROFILER:
+        ...     ld_group_mover.move('group_mover_1')
+        >>> print(utils.PROFILER.format_report())
+        >>> utils.PROFILER.dump('/tmp/move_profile.json')
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.commands = {}
+        self.operations = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    # --------------------------------------------------------------------------
+    def start(self, reset=True):
+        if reset:
+            self.reset()
+        self.enabled = True
+        backend.set_profiler(self)
+
+    def stop(self):
+        self.enabled = False
+        backend.set_profiler(None)
+
+    def reset(self):
+        self.commands.clear()
+        self.operations.clear()
+
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def _record(data, name, duration):
+        stats = data.get(name)
+        if stats is None:
+            data[name] = {'count': 1, 'total': duration, 'worst': duration}
+            return
+
+        stats['count'] += 1
+        stats['total'] += duration
+        stats['worst'] = max(stats['worst'], duration)
+
+    def wrap_command(self, name, func):
+        @wraps(func)
+        def profiled(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                label = name
+                # Split mel evaluations by the procedure called.
+                if name == 'mel.eval' and args:
+                    label = 'mel.' + args[0].strip().split(' ', 1)[0].split('(', 1)[0]
+                self._record(self.commands, label, time.time() - start)
+        return profiled
+
+    def wrap_operation(self, name, func):
+        @wraps(func)
+        def profiled(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(self.operations, name, time.time() - start)
+        return profiled
+
+    # --------------------------------------------------------------------------
+    def report(self):
+        """
+        Return the recorded statistics.
+
+        :return: Count, total and worst time in seconds per command and operation.
+        :rtype: dict(str, dict(str, dict))
+        """
+        return {
+            'commands': {name: dict(stats) for name, stats in self.commands.items()},
+            'operations': {name: dict(stats) for name, stats in self.operations.items()},
+        }
+
+    def format_report(self, limit=None):
+        """
+        Return the report as a table, slowest total time first.
+
+        :param limit: Maximum number of rows per section. All if None given.
+        :type limit: int / None
+
+        :rtype: str
+        """
+        lines = []
+        for title, data in (('Operations', self.operations), ('Commands', self.commands)):
+            lines.append('{:<48} {:>8} {:>12} {:>12}'.format(title, 'count', 'total (s)', 'worst (s)'))
+            ordered = sorted(data.items(), key=lambda item: item[1]['total'], reverse=True)
+            for name, stats in ordered[:limit]:
+                lines.append('{:<48} {:>8} {:>12.6f} {:>12.6f}'.format(
+                    name,
+                    stats['count'],
+                    stats['total'],
+                    stats['worst'],
+                ))
+            lines.append('')
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """
+        Write the report to a json file.
+
+        :param path: File path.
+        :type path: str
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+
+
+PROFILER = Profiler()
+
+
+class _OperationContext(_ContextDecorator):
+    """
+    Context decorator recording the wall time of decorated operations, in
+    the profiler active in the backend.
+    """
+
+    def __call__(self, func):
+        decorated = _ContextDecorator.__call__(self, func)
+        name = '{}.{}'.format(func.__module__, func.__name__)
+
+        @wraps(func)
+        def profiled(*args, **kwargs):
+            wrap_operation = getattr(backend.get_profiler(), 'wrap_operation', None)
+            if wrap_operation is None:
+                return decorated(*args, **kwargs)
+            return wrap_operation(name, decorated)(*args, **kwargs)
+        return profiled
+
+
+# ------------------------------------------------------------------------------
+class UndoChunk(_OperationContext):
     """Contain all scoped operations into single undo."""
 
     def __enter__(self):
@@ -29,7 +186,7 @@ class UndoChunk(_ContextDecorator):
         return False
 
 
-class SuspendRefresh(_ContextDecorator):
+class SuspendRefresh(_OperationContext):
     """Suspend viewport update."""
 
     def __enter__(self):
@@ -69,11 +226,113 @@ def xform_snap(source, target, worldspace=True):
     mc.xform(target, ws=worldspace, t=position, ro=rotation)
 
 
+def matrix_snap(pairs, scale=False, undoable=False):
+    """
+    Snap each target to the worldspace transform of its source in bulk.
+
+    All source world matrices are read in one pass and every target is written
+    in a second pass, through a single DG modifier in Maya. Rotate order, rotate
+    axis, pivots, offsetParentMatrix and joint orient of the targets are
+    accounted for.
+
+    .. note::
+        In Maya the modifier writes are not recorded in the undo queue, use
+        undoable when the snap must survive an undo and redo.
+
+    :param pairs: Source and target nodes.
+    :type pairs: list(tuple(str, str))
+    :param scale: Also match the source scale.
+    :type scale: bool
+    :param undoable: Write each target with xform instead, recorded for undo.
+    :type undoable: bool
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+
+    if not undoable:
+        api.snap_transforms(pairs, scale=scale)
+        return
+
+    matrices = [mc.xform(source, q=True, ws=True, matrix=True) for source, _ in pairs]
+    for (_, target), matrix in zip(pairs, matrices):
+        current_scale = None if scale else mc.getAttr(target + '.scale')[0]
+        mc.xform(target, ws=True, matrix=matrix)
+        if current_scale is not None:
+            mc.setAttr(target + '.scale', *current_scale)
+
+
+def get_points(shape, world=False):
+    """
+    Return all point positions of the mesh or nurbsCurve shape in one query.
+
+    :param shape: Mesh or nurbsCurve shape.
+    :type shape: str
+    :param world: Return worldspace positions, otherwise objectspace.
+    :type world: bool
+
+    :return: list(list(float, float, float))
+    """
+    return api.get_points(shape, world=world)
+
+
+def set_points(shape, points, world=False):
+    """
+    Set all point positions of the mesh or nurbsCurve shape in one write.
+
+    :param shape: Mesh or nurbsCurve shape.
+    :type shape: str
+    :param points: Positions matching the shape's point count.
+    :type points: list(list(float, float, float))
+    :param world: Positions are worldspace, otherwise objectspace.
+    :type world: bool
+    """
+    api.set_points(shape, points, world=world)
+
+
+def get_mesh_topology(mesh):
+    """
+    Return the polygon vertex counts and vertex indices of the mesh.
+
+    :param mesh: Mesh shape or transform.
+    :type mesh: str
+
+    :return: list(int), list(int)
+    """
+    return api.get_mesh_topology(mesh)
+
+
 def filter_by_shape(node_list, shape_types):
-    return list(filter(
-        lambda x: mc.listRelatives(x, shapes=True, typ=shape_types),
-        node_list,
-    ))
+    """
+    Return the nodes with a shape of the given types, in the given order.
+
+    Shapes of all nodes are queried at once and mapped back to every parent,
+    so instanced shapes match all of their transforms.
+
+    :param node_list: Transforms to filter.
+    :type node_list: list(str)
+    :param shape_types: Shape node type(s) to match.
+    :type shape_types: str / list(str)
+
+    :rtype: list(str)
+    """
+    node_list = list(node_list)
+    if not node_list:
+        return []
+
+    shapes = mc.listRelatives(node_list, shapes=True, type=shape_types, noIntermediate=True, fullPath=True)
+    if not shapes:
+        return []
+
+    # Match short names and partial paths against every trailing part of the
+    # parent paths, without another ls query.
+    names = set()
+    for parent in mc.listRelatives(shapes, allParents=True, fullPath=True) or []:
+        parts = parent.lstrip('|').split('|')
+        names.add(parent)
+        names.update('|'.join(parts[i:]) for i in range(len(parts)))
+
+    return [node for node in node_list if node in names]
 
 
 def get_active_camera():
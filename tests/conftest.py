@@ -0,0 +1,48 @@
+"""
+Shared fixtures, running every test against a fresh in-memory scene.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ld_tools import backend
+from ld_tools import symmetry
+from ld_tools.tools import ld_group_mover
+from ld_tools.tools import ld_select_me
+
+
+# ------------------------------------------------------------------------------
+def create_grid(memory, name, size=4):
+    """Create a flat grid mesh, symmetric across X."""
+    points = [
+        [i - (size - 1) * 0.5, float(j), 0.0]
+        for j in range(size)
+        for i in range(size)
+    ]
+    counts = []
+    connects = []
+    for j in range(size - 1):
+        for i in range(size - 1):
+            corner = j * size + i
+            counts.append(4)
+            connects.extend([corner, corner + 1, corner + size + 1, corner + size])
+
+    return memory.scene.create_mesh(name, points, counts, connects)
+
+
+@pytest.fixture
+def memory():
+    """Set a new memory backend and clear the module caches of any previous scene."""
+    memory = backend.set_backend(backend.BACKEND_MEMORY)
+    symmetry.CACHE.clear()
+    ld_group_mover._clear_scene_caches()
+    ld_select_me._clear_scene_caches()
+
+    # Scene jobs die with the previous scene.
+    del ld_group_mover._SCENE_JOBS[:]
+    del ld_select_me._SCENE_JOBS[:]
+
+    return memory
@@ -0,0 +1,42 @@
+from ld_tools.tools import ld_group_mover
+
+
+# ------------------------------------------------------------------------------
+def test_callback_mover_moves_targets(memory):
+    node = memory.scene.create_cube('cube')[0].name
+    memory.cmds.xform(node, ws=True, t=(3, 4, 5))
+
+    mover = ld_group_mover.create_group_mover([node])
+    assert ld_group_mover.find_group_movers() == [mover]
+    assert ld_group_mover.get_targets(mover) == [('cube__group_mover_tgt', node)]
+
+    memory.cmds.xform(mover, ws=True, t=(1, 1, 1))
+    ld_group_mover.move(mover)
+    assert memory.cmds.xform(node, q=True, ws=True, t=True) == [4.0, 5.0, 6.0]
+
+
+def test_native_mover_drives_offset_parent_matrix(memory):
+    node = memory.scene.create_cube('cube')[0].name
+    driver = memory.scene.create_transform('driver').name
+    memory.cmds.setAttr(node + '.translate', 1, 2, 3)
+    memory.cmds.connectAttr(driver + '.worldMatrix[0]', node + '.offsetParentMatrix')
+
+    mover = ld_group_mover.create_group_mover([node], mode=ld_group_mover.MODE_NATIVE)
+    source = ld_group_mover.get_targets(mover)[0][0]
+    assert memory.cmds.listConnections(node + '.offsetParentMatrix', plugs=True) == [source + '_multMatrix.matrixSum']
+    assert not memory.cmds.listConnections(node + '.translate', source=True, destination=False)
+
+    ld_group_mover.delete()
+    assert memory.cmds.listConnections(node + '.offsetParentMatrix', plugs=True) == [driver + '.worldMatrix[0]']
+    assert not memory.cmds.ls(type='multMatrix')
+    assert memory.cmds.getAttr(node + '.translate') == [(1.0, 2.0, 3.0)]
+
+
+def test_target_cache_cleared_on_scene_open(memory, tmpdir):
+    path = str(tmpdir.join('empty.json'))
+    memory.save_scene(path)
+    mover = ld_group_mover.create_group_mover([memory.scene.create_cube('cube')[0].name])
+    ld_group_mover.get_targets(mover)
+
+    memory.open_scene(path)
+    assert not ld_group_mover._TARGET_CACHE
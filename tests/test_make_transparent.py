@@ -0,0 +1,53 @@
+import pytest
+
+from ld_tools.tools import ld_make_transparent
+
+
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def cubes(memory):
+    for name in ('a', 'b', 'c'):
+        memory.scene.create_cube(name)
+
+    memory.cmds.sets(n=ld_make_transparent.DEFAULT_SHADING_ENGINE, renderable=True, empty=True)
+    red = memory.cmds.sets(n='red_SG', renderable=True, empty=True)
+    memory.cmds.sets(['a', 'b'], fe=red)
+    memory.cmds.sets(['c'], fe=ld_make_transparent.DEFAULT_SHADING_ENGINE)
+    return ['a', 'b', 'c']
+
+
+def test_toggle_transparency(cubes):
+    transparent = ld_make_transparent.TRANSPARENT_SHADING_ENGINE_NAME
+
+    ld_make_transparent.toggle_transparency(['a', 'b'])
+    index = ld_make_transparent.get_shading_engine_index(cubes)
+    assert index['aShape'] == [(transparent, None)]
+    assert index['bShape'] == [(transparent, None)]
+    assert index['cShape'] == [(ld_make_transparent.DEFAULT_SHADING_ENGINE, None)]
+    assert ld_make_transparent.get_shader_mapping_for_node('a') == 'red_SG'
+
+    ld_make_transparent.toggle_transparency(['a', 'b'])
+    index = ld_make_transparent.get_shading_engine_index(cubes)
+    assert index['aShape'] == [('red_SG', None)]
+    assert index['bShape'] == [('red_SG', None)]
+    assert not ld_make_transparent.get_shader_mappings()
+
+
+def test_toggle_transparency_components_only(cubes):
+    transparent = ld_make_transparent.TRANSPARENT_SHADING_ENGINE_NAME
+
+    ld_make_transparent.toggle_transparency(['c.f[1]'])
+    index = ld_make_transparent.get_shading_engine_index(cubes)
+    assert index['aShape'] == [('red_SG', None)]
+    assert sorted(index['cShape']) == [
+        (ld_make_transparent.DEFAULT_SHADING_ENGINE, ['f[0]', 'f[2:5]']),
+        (transparent, ['f[1]']),
+    ]
+
+    ld_make_transparent.toggle_transparency(['c.f[1]'])
+    index = ld_make_transparent.get_shading_engine_index(cubes)
+    assert index['cShape'] == [(ld_make_transparent.DEFAULT_SHADING_ENGINE, None)]
+
+
+def test_empty_index(cubes):
+    assert ld_make_transparent.get_shading_engine_index([]) == {}
@@ -0,0 +1,45 @@
+from conftest import create_grid
+
+from ld_tools import deformers
+from ld_tools import symmetry
+from ld_tools.tools import ld_mirror_me
+
+
+# ------------------------------------------------------------------------------
+def test_deformer_mirror(memory):
+    create_grid(memory, 'body')
+    deformer, handle = memory.cmds.cluster(['body.vtx[0:1]', 'body.vtx[4]'], n='L_cls')
+    deformers.set_weights(deformer, {'body': ([0, 1, 4], [1.0, 0.5, 0.25])})
+
+    ld_mirror_me.deformer_mirror('body', [handle], 1, 'L_', 'R_')
+
+    assert memory.cmds.objExists('R_clsHandle')
+    mirrored = ld_mirror_me._get_cluster('R_clsHandle')
+    indices, weights = deformers.get_weights(mirrored)['|body']
+    assert dict(zip(indices, weights)) == {3: 1.0, 2: 0.5, 7: 0.25}
+
+
+def test_symmetry_map_not_cached_from_asymmetric_mesh(memory):
+    create_grid(memory, 'body')
+    _, sculpt = create_grid(memory, 'sculpt')
+    sculpt.data['points'][3] = [4.0, 0.0, 0.0]
+
+    symmetry.get_symmetry_map('sculpt', 1)
+    assert not len(symmetry.CACHE)
+    assert symmetry.get_symmetry_map('body', 1)[:4] == [3, 2, 1, 0]
+
+
+def test_mesh_mirror_drops_symmetry_map(memory):
+    create_grid(memory, 'body')
+    symmetry.get_symmetry_map('body', 1)
+    target = memory.cmds.duplicate('body', n='L_smile')[0]
+    points = memory.api.get_points(target)
+    points[0][2] = 1.0
+    memory.api.set_points(target, points)
+
+    ld_mirror_me.mesh_mirror('body', [target], 2, 1, 'L_', 'R_')
+
+    points = memory.api.get_points('R_smile')
+    assert [index for index, point in enumerate(points) if point[2] == 1.0] == [3]
+    shape = memory.cmds.listRelatives('R_smile', shapes=True)[0]
+    assert not memory.cmds.attributeQuery(symmetry.SYMMETRY_MAP_ATTR, n=shape, ex=True)
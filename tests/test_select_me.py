@@ -0,0 +1,69 @@
+import pytest
+
+from ld_tools.tools import ld_select_me
+
+
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def rigs(memory):
+    for namespace in ('rigA', 'rigB'):
+        for name in ('ctrl0', 'ctrl1'):
+            memory.scene.create_transform('{}:{}'.format(namespace, name))
+    memory.scene.create_transform('world_ctrl')
+    return memory
+
+
+def test_select_set(rigs):
+    ld_select_me.store_set('face', ['rigA:ctrl0', 'rigA:ctrl1', 'world_ctrl'])
+
+    rigs.cmds.select(cl=True)
+    ld_select_me.select_set('face')
+    assert rigs.cmds.ls(sl=True) == ['rigA:ctrl0', 'rigA:ctrl1', 'world_ctrl']
+
+    # Remapped to the namespace of the current selection.
+    rigs.cmds.select('rigB:ctrl1')
+    ld_select_me.select_set('face')
+    assert rigs.cmds.ls(sl=True) == ['rigB:ctrl0', 'rigB:ctrl1', 'world_ctrl']
+
+
+def test_select_set_finds_renamed_nodes(rigs):
+    ld_select_me.store_set('face', ['rigA:ctrl0', 'rigA:ctrl1', 'world_ctrl'])
+    rigs.cmds.rename('world_ctrl', 'renamed_ctrl')
+
+    rigs.cmds.select(cl=True)
+    ld_select_me.select_set('face')
+    assert rigs.cmds.ls(sl=True) == ['rigA:ctrl0', 'rigA:ctrl1', 'renamed_ctrl']
+
+
+def test_store_empty_set(rigs):
+    with pytest.raises(ValueError):
+        ld_select_me.store_set('empty', [])
+
+
+def test_library_namespace_map(rigs, tmpdir):
+    path = str(tmpdir.join('library.json'))
+    ld_select_me.store_set('face', ['rigA:ctrl0', 'world_ctrl'])
+    ld_select_me.export_library(path)
+    ld_select_me.remove_set('face')
+
+    namespace_map = {'rigA': 'rigB'}
+    ld_select_me.import_library(path, namespace_map=namespace_map, shelf=False)
+    rigs.cmds.select(cl=True)
+    ld_select_me.select_set('face', library=path, namespace_map=namespace_map)
+    assert rigs.cmds.ls(sl=True) == ['rigB:ctrl0', 'world_ctrl']
+
+    with pytest.raises(ValueError):
+        ld_select_me.import_library(path, names=['missing'], shelf=False)
+
+
+def test_cache_cleared_on_scene_open(rigs, tmpdir):
+    path = str(tmpdir.join('scene.json'))
+    ld_select_me.store_set('face', ['rigA:ctrl0'])
+    rigs.save_scene(path)
+    assert ld_select_me.resolve_set('face') == ['rigA:ctrl0']
+
+    ld_select_me.store_set('face', ['rigA:ctrl1'])
+    assert ld_select_me.resolve_set('face') == ['rigA:ctrl1']
+
+    rigs.open_scene(path)
+    assert ld_select_me.resolve_set('face') == ['rigA:ctrl0']
@@ -0,0 +1,53 @@
+from ld_tools import utils
+from ld_tools.backend import cmds as mc
+
+
+# ------------------------------------------------------------------------------
+def test_filter_by_shape_keeps_order_and_duplicates(memory):
+    memory.scene.create_cube('a')
+    memory.scene.create_curve('c', [[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0]])
+    group = memory.cmds.group(empty=True, n='grp')
+
+    nodes = ['c', 'a', group, '|a', 'a']
+    assert utils.filter_by_shape(nodes, 'mesh') == ['a', '|a', 'a']
+    assert utils.filter_by_shape(nodes, ['mesh', 'nurbsCurve']) == ['c', 'a', '|a', 'a']
+    assert utils.filter_by_shape([], 'mesh') == []
+
+
+def test_filter_by_shape_matches_absolute_names_exactly(memory):
+    memory.cmds.createNode('transform', n='b')
+    group = memory.cmds.group(empty=True, n='grp')
+    cube = memory.scene.create_cube('b1')[0].name
+    memory.cmds.parent(cube, group)
+
+    assert utils.filter_by_shape(['|b', 'b1', '|grp|b1', 'grp|b1'], 'mesh') == ['b1', '|grp|b1', 'grp|b1']
+
+
+def test_matrix_snap(memory):
+    source = memory.scene.create_transform('source').name
+    target = memory.scene.create_transform('target').name
+    memory.cmds.xform(source, ws=True, t=(1, 2, 3), ro=(0, 90, 0))
+    memory.cmds.setAttr(source + '.scale', 2, 2, 2)
+
+    for undoable in (False, True):
+        memory.cmds.xform(target, ws=True, t=(0, 0, 0), ro=(0, 0, 0))
+        utils.matrix_snap([(source, target)], undoable=undoable)
+        assert memory.cmds.xform(target, q=True, ws=True, t=True) == [1.0, 2.0, 3.0]
+        assert [round(value, 6) for value in memory.cmds.xform(target, q=True, ws=True, ro=True)] == [0.0, 90.0, 0.0]
+        assert memory.cmds.getAttr(target + '.scale') == [(1.0, 1.0, 1.0)]
+
+    utils.matrix_snap([(source, target)], scale=True)
+    assert memory.cmds.getAttr(target + '.scale') == [(2.0, 2.0, 2.0)]
+
+
+def test_operations_are_recorded_by_the_active_profiler(memory):
+    @utils.UndoChunk()
+    def operation():
+        mc.ls()
+
+    profiler = utils.Profiler()
+    with profiler:
+        operation()
+
+    assert list(profiler.operations) == [__name__ + '.operation']
+    assert 'cmds.ls' in profiler.commands